@@ -0,0 +1,206 @@
+"""linebot 對外服務 (MongoDB、Anthropic、LINE) 的 client
+
+client 都在每個 process 第一次使用時才建立: 以 gunicorn --preload 啟動時，
+父 process 建立的連線池不能在 fork 出來的 worker 中使用 (pymongo 會警告並可能卡住)。
+連線池大小與逾時由呼叫端設定，`PoolMonitor` 與 `session_stats` 回報目前 process 的連線池使用狀況；
+MongoDB 連線池同時匯出到 Prometheus (見 metrics.py)，/metrics 會合併所有 worker。
+"""
+import os
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+import requests
+from requests.adapters import HTTPAdapter
+from linebot.http_client import RequestsHttpClient, RequestsHttpResponse
+from pymongo.monitoring import ConnectionPoolListener
+from app import metrics
+
+T = TypeVar("T")
+
+class PerProcess(Generic[T]):
+    """第一次存取時以 factory 建立；pid 改變 (fork 之後) 時在新的 process 重新建立
+
+    屬性存取會轉給實際的物件，因此可以直接當成該 client 使用。
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._value: T | None = None
+
+    def get(self) -> T:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self._factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    @property
+    def created(self) -> bool:
+        return self._pid == os.getpid()
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+class LazyCollection:
+    """延遲取得的 collection，讓模組載入時就能把 collection 交給其他物件而不建立連線"""
+
+    def __init__(self, client: PerProcess, database: str, name: str):
+        self._client = client
+        self._database = database
+        self._name = name
+
+    def __getattr__(self, name: str):
+        return getattr(self._client.get()[self._database][self._name], name)
+
+class LazyDatabase:
+    """只提供 collection 的存取 (`db.users`、`db["users"]`)，資料庫指令請使用 `client.get()[name]`"""
+
+    def __init__(self, client: PerProcess, name: str):
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, name: str) -> LazyCollection:
+        return LazyCollection(self._client, self._name, name)
+
+    def __getitem__(self, name: str) -> LazyCollection:
+        return LazyCollection(self._client, self._name, name)
+
+class PoolMonitor(ConnectionPoolListener):
+    """統計 pymongo 連線池: 開啟中 / 借出中的連線數、等待借出的時間與失敗次數
+
+    `stats()` 只有目前這個 process 的數字；整個服務的總和看 /metrics 的 linebot_mongo_pool_*。
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.max_wait_ms = 0.0
+        self.cleared = 0
+
+    def pool_ready(self, event): pass
+    def connection_ready(self, event): pass
+
+    def pool_created(self, event):
+        metrics.MONGO_POOL_CAPACITY.inc(self.max_pool_size)
+
+    def pool_closed(self, event):
+        metrics.MONGO_POOL_CAPACITY.dec(self.max_pool_size)
+
+    def pool_cleared(self, event):
+        metrics.MONGO_POOL_CLEARED.inc()
+        with self._lock:
+            self.cleared += 1
+
+    def connection_created(self, event):
+        metrics.MONGO_POOL_OPEN.inc()
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        metrics.MONGO_POOL_OPEN.dec()
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        metrics.MONGO_POOL_CHECKOUTS.labels("failed").inc()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        wait = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        metrics.MONGO_POOL_CHECKOUTS.labels("ok").inc()
+        metrics.MONGO_POOL_WAIT_SECONDS.observe(wait)
+        metrics.MONGO_POOL_CHECKED_OUT.inc()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.max_wait_ms = max(self.max_wait_ms, wait * 1000)
+
+    def connection_checked_in(self, event):
+        metrics.MONGO_POOL_CHECKED_OUT.dec()
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "utilization": self.checked_out / self.max_pool_size if self.max_pool_size else 0.0,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+                "cleared": self.cleared,
+            }
+
+class PooledHttpClient(RequestsHttpClient):
+    """LineBotApi 預設每次呼叫都用 `requests.post`，不會重用連線；這裡改用共用 keep-alive 連線池的 Session"""
+
+    def __init__(self, timeout=RequestsHttpClient.DEFAULT_TIMEOUT, session: requests.Session | None = None):
+        super().__init__(timeout)
+        self.session = session or pooled_session(10)
+
+    def get(self, url, headers=None, params=None, stream=False, timeout=None):
+        response = self.session.get(url, headers=headers, params=params, stream=stream, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        response = self.session.post(url, headers=headers, data=data, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+
+    def delete(self, url, headers=None, data=None, timeout=None):
+        response = self.session.delete(url, headers=headers, data=data, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+
+    def put(self, url, headers=None, data=None, timeout=None):
+        response = self.session.put(url, headers=headers, data=data, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """pool_size: 每個 host 保留的 keep-alive 連線數，超過時多出的連線用完即關閉 (不會阻塞)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def session_stats(session: requests.Session) -> dict:
+    hosts = {}
+    for scheme in ("https://", "http://"):
+        adapter = session.adapters[scheme]
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools[key]
+            hosts[f"{pool.scheme}://{pool.host}"] = {
+                "pool_size": pool.pool.maxsize if pool.pool else 0,
+                # 佇列中以 None 佔位，只有實際的連線才算閒置
+                "idle": sum(1 for connection in pool.pool.queue if connection is not None) if pool.pool else 0,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+            }
+    return hosts
+
+def httpx_pool_stats(http_client) -> dict:
+    """httpx 沒有公開連線池的統計，盡量從 httpcore 的連線池取得"""
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return {}
+    return {
+        "connections": len(connections),
+        "idle": sum(1 for connection in connections if connection.is_idle()),
+    }
@@ -0,0 +1,76 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger("linebot.dedupe")
+
+class WebhookDeduplicator:
+    """以 webhookEventId 去除 LINE 重送的事件
+
+    第一次處理某個事件時以它的 id 作為 _id 寫入 collection (TTL 索引會自動清除舊紀錄)，
+    重複的 id 會因 unique 的 _id 寫入失敗。近期的 id 另外記在記憶體 LRU，同一個 process 內不必查資料庫。
+    沒有 webhookEventId 的事件一律處理。
+    """
+
+    def __init__(self, collection: Collection, lru_size: int = 4096):
+        self.collection = collection
+        self.lru_size = lru_size
+        self._lock = threading.Lock()
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        self.claimed = 0
+        self.duplicates_memory = 0
+        self.duplicates_db = 0
+        self.redeliveries = 0
+        self.without_id = 0
+
+    def _remember(self, event_id: str):
+        self._recent[event_id] = None
+        self._recent.move_to_end(event_id)
+        while len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+    def claim(self, event) -> bool:
+        """第一次看到這個事件時回傳 True，重複的事件回傳 False"""
+        event_id = getattr(event, "webhook_event_id", None)
+        delivery_context = getattr(event, "delivery_context", None)
+        redelivery = bool(getattr(delivery_context, "is_redelivery", False))
+        with self._lock:
+            if redelivery:
+                self.redeliveries += 1
+            if not event_id:
+                self.without_id += 1
+                return True
+            if event_id in self._recent:
+                self.duplicates_memory += 1
+                logger.info(f"略過重複的事件 {event_id} (redelivery={redelivery})")
+                return False
+            self._remember(event_id)
+
+        try:
+            self.collection.insert_one({"_id": event_id, "redelivery": redelivery, "created_at": datetime.now()})
+        except DuplicateKeyError:
+            with self._lock:
+                self.duplicates_db += 1
+            logger.info(f"略過已由其他 process 處理的事件 {event_id} (redelivery={redelivery})")
+            return False
+        except PyMongoError as e:
+            # 寧可重複處理，也不要因為資料庫暫時無法寫入而漏掉訊息
+            logger.warning(f"無法記錄事件 {event_id}，仍繼續處理: {e}")
+        with self._lock:
+            self.claimed += 1
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "claimed": self.claimed,
+                "duplicates": self.duplicates_memory + self.duplicates_db,
+                "duplicates_memory": self.duplicates_memory,
+                "duplicates_db": self.duplicates_db,
+                "redeliveries": self.redeliveries,
+                "without_id": self.without_id,
+                "lru_size": len(self._recent),
+            }
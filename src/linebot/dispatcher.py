@@ -0,0 +1,202 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable
+from app import metrics
+
+logger = logging.getLogger("linebot.dispatcher")
+
+_STOP = object()
+
+class EventDispatcher:
+    """webhook 事件佇列 + 固定大小的背景工作執行緒
+
+    callback 驗證簽章後把事件丟進佇列就回 200，工作執行緒再呼叫 `handle`。
+    佇列有上限，滿了 `submit` 會回傳 False，由呼叫端決定回應 (例如 503 讓 LINE 重送)。
+    """
+
+    def __init__(self, handle: Callable[[Any], None], workers: int = 8, max_queue: int = 256):
+        self.handle = handle
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._started = False
+        self._closed = False
+        self._abandoned = False # 關閉逾時後，工作執行緒不再取出新的事件
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+        self.max_depth = 0
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"webhook-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        metrics.WEBHOOK_WORKERS.set(self.workers)
+        metrics.WEBHOOK_QUEUE_CAPACITY.set(self.max_queue)
+        atexit.register(self.shutdown)
+        logger.info(f"webhook 背景工作執行緒已啟動: workers={self.workers} max_queue={self.max_queue}")
+
+    def submit(self, items: list) -> bool:
+        """整批放入佇列，空間不足時整批拒絕，避免同一個 webhook 只處理一半"""
+        if self._closed:
+            metrics.WEBHOOK_REJECTED.inc(len(items))
+            return False
+        with self._submit_lock:
+            if self.max_queue - self._queue.qsize() < len(items):
+                with self._stats_lock:
+                    self.rejected += len(items)
+                metrics.WEBHOOK_REJECTED.inc(len(items))
+                return False
+            for item in items:
+                self._queue.put_nowait((time.monotonic(), item))
+            with self._stats_lock:
+                self.accepted += len(items)
+                self.max_depth = max(self.max_depth, self._queue.qsize())
+            metrics.WEBHOOK_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            metrics.WEBHOOK_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                if entry is _STOP or self._abandoned:
+                    return
+                enqueued_at, item = entry
+                with self._stats_lock:
+                    self.busy += 1
+                metrics.WEBHOOK_WORKERS_BUSY.inc()
+                wait = time.monotonic() - enqueued_at
+                if wait > 5:
+                    logger.warning(f"事件在佇列中等待了 {wait:.1f} 秒")
+                try:
+                    self.handle(item)
+                    with self._stats_lock:
+                        self.processed += 1
+                except Exception as e:
+                    logger.exception(f"背景處理事件時發生錯誤: {e}")
+                    with self._stats_lock:
+                        self.failed += 1
+                finally:
+                    with self._stats_lock:
+                        self.busy -= 1
+                    metrics.WEBHOOK_WORKERS_BUSY.dec()
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, timeout: float = 25.0):
+        """停止接收新事件，等待佇列中的事件處理完 (最多 timeout 秒)"""
+        if not self._started or self._closed:
+            return
+        self._closed = True
+        logger.info(f"等待 webhook 佇列清空，剩餘 {self._queue.qsize()} 個事件")
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            # 佇列是 FIFO，停止訊號排在所有剩餘事件之後。
+            # 佇列已滿且工作執行緒都卡在慢的呼叫時不能無限等待，否則 gunicorn 的 worker 無法結束
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logger.warning("webhook 佇列已滿，無法放入停止訊號")
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            # 執行緒是 daemon，process 結束時會直接終止；這裡只避免它們再開始處理新的事件
+            self._abandoned = True
+        remaining = self._queue.qsize()
+        if remaining:
+            logger.warning(f"關閉時仍有 {remaining} 個事件未處理")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "busy": self.busy,
+                "queue_depth": self._queue.qsize(),
+                "queue_max": self.max_queue,
+                "queue_max_seen": self.max_depth,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed,
+            }
+
+def source_key(event) -> str | None:
+    """事件的排序單位: 同一位用戶的事件必須依序處理，沒有 user_id 時退而使用群組 / 聊天室"""
+    source = getattr(event, "source", None)
+    for attr in ("user_id", "group_id", "room_id"):
+        value = getattr(source, attr, None)
+        if value:
+            return value
+    return None
+
+def group_by_source(events: list) -> list[list]:
+    """依來源分組，組內維持 webhook 中的順序；沒有來源的事件各自一組"""
+    groups: dict[str, list] = {}
+    singles: list[list] = []
+    for event in events:
+        key = source_key(event)
+        if key is None:
+            singles.append([event])
+        else:
+            groups.setdefault(key, []).append(event)
+    return list(groups.values()) + singles
+
+class BatchDispatcher:
+    """同一個 webhook 內不同用戶的事件並行處理，同一位用戶的事件仍依序處理
+
+    `run_group` 依序處理一組事件，單一事件失敗不影響同組後續事件。
+    `run` 等待整批處理完才回傳，並行度由共用的執行緒池限制 (跨 request 共用)。
+    """
+
+    def __init__(self, handle: Callable[[Any], None], max_parallel: int = 4):
+        self.handle = handle
+        self.max_parallel = max_parallel
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="webhook-batch")
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.parallel_batches = 0
+        self.max_groups = 0
+
+    def run_group(self, events: list):
+        for event in events:
+            try:
+                self.handle(event)
+            except Exception as e:
+                logger.exception(f"處理事件時發生錯誤: {e}")
+
+    def run(self, events: list):
+        groups = group_by_source(events)
+        with self._stats_lock:
+            self.batches += 1
+            self.max_groups = max(self.max_groups, len(groups))
+            if len(groups) > 1:
+                self.parallel_batches += 1
+        if len(groups) <= 1:
+            for group in groups:
+                self.run_group(group)
+            return
+        wait([self._executor.submit(self.run_group, group) for group in groups])
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_parallel": self.max_parallel,
+                "batches": self.batches,
+                "parallel_batches": self.parallel_batches,
+                "max_groups": self.max_groups,
+            }
@@ -0,0 +1,176 @@
+import json
+import logging
+import anthropic
+from anthropic.types.beta import BetaMessageParam
+from mongo.tokens import estimate_tokens
+
+logger = logging.getLogger("linebot.history")
+
+SUMMARY_PROMPT = """你負責維護台科大鋼琴社 LINE 小助手與一位使用者之間的對話摘要。
+以下會提供「目前的摘要」以及接在摘要之後、即將從對話紀錄中移除的對話。
+請輸出更新後的摘要，供小助手在之後的對話中參考:
+
+- 保留使用者的身分資訊、偏好、已完成或進行到一半的事務 (入社、一對一教學報名、幹部申請等) 與重要的工具結果。
+- 省略寒暄與已不再重要的細節，不要捏造內容。
+- 以使用者使用的語言撰寫，使用純文字條列，不超過 300 字。
+- 只輸出摘要本身。"""
+
+def message_tokens(message: BetaMessageParam) -> int:
+    content = message["content"]
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    return estimate_tokens(content) + 4
+
+def history_tokens(history: list[BetaMessageParam]) -> int:
+    return sum(message_tokens(m) for m in history)
+
+def split_history(
+    history: list[BetaMessageParam],
+    budget: int,
+    target: int
+) -> tuple[list[BetaMessageParam], list[BetaMessageParam]]:
+    """超過 budget 時，從最舊的一輪開始移除直到不超過 target，回傳 (移除的, 保留的)
+
+    每次移除到下一則 user 訊息為止，保留的歷史一定以 user 開頭，且至少保留最新一輪。
+    target 小於 budget，讓前綴在接下來幾輪維持不變，prompt cache 才能持續命中。
+    """
+    sizes = [message_tokens(m) for m in history]
+    remaining = sum(sizes)
+    if remaining <= budget:
+        return [], history
+
+    last_user = max((i for i, m in enumerate(history) if m["role"] == "user"), default=0)
+    cut = 0
+    while cut < last_user and remaining > target:
+        remaining -= sizes[cut]
+        cut += 1
+        while cut < last_user and history[cut]["role"] != "user":
+            remaining -= sizes[cut]
+            cut += 1
+    return history[:cut], history[cut:]
+
+def cap_messages(history: list[BetaMessageParam], max_messages: int) -> list[BetaMessageParam]:
+    """摘要一直失敗時的保險: 超過 max_messages 則訊息時從最舊的一輪開始捨棄，保留的歷史同樣以 user 開頭"""
+    if max_messages <= 0 or len(history) <= max_messages:
+        return history
+    starts = [i for i, m in enumerate(history) if m["role"] == "user" and len(history) - i <= max_messages]
+    # 最新一輪本身就超過上限時仍保留整輪，不拆開工具呼叫與結果
+    cut = starts[0] if starts else max((i for i, m in enumerate(history) if m["role"] == "user"), default=0)
+    return history[cut:]
+
+def render_message(message: BetaMessageParam) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return f"{message['role']}: {content}"
+    parts = []
+    for block in content:
+        match block.get("type"):
+            case "text":
+                parts.append(block["text"])
+            case "mcp_tool_use":
+                parts.append(f"<使用工具: {block['name']}({block.get('input')})>")
+            case "mcp_tool_result":
+                result = block.get("content")
+                if isinstance(result, list):
+                    result = "\n".join(b.get("text", "") for b in result)
+                parts.append(f"<工具結果: {result}>")
+    return f"{message['role']}: " + "\n".join(parts)
+
+def summarize(
+    client: anthropic.Anthropic,
+    model: str,
+    summary: str,
+    messages: list[BetaMessageParam]
+) -> str:
+    """把即將移除的對話併入摘要"""
+    transcript = "\n\n".join(render_message(m) for m in messages)
+    response = client.messages.create(
+        model=model,
+        max_tokens=600,
+        system=SUMMARY_PROMPT,
+        messages=[{
+            "role": "user",
+            "content": f"目前的摘要:\n{summary or '(無)'}\n\n即將移除的對話:\n{transcript}"
+        }]
+    )
+    return "".join(block.text for block in response.content if block.type == "text").strip()
+
+TOOL_RESULT_PREFIX = "<工具結果: "
+WEEKDAY_KEYS = {"M", "T", "W", "R", "F", "S", "U"}
+
+def tool_result_text(block: dict) -> str:
+    content = block.get("content")
+    if isinstance(content, list):
+        return "\n".join(b.get("text", "") for b in content if isinstance(b, dict))
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+def digest_text(text: str) -> str:
+    """把工具結果濃縮成一行描述，例如 "98-slot schedule, 12 lessons" """
+    try:
+        value = json.loads(text)
+    except ValueError:
+        value = None
+    if isinstance(value, dict) and value and set(value) <= WEEKDAY_KEYS:
+        slots = sum(len(periods or {}) for periods in value.values())
+        lessons = sum(1 for periods in value.values() for cell in (periods or {}).values() if cell)
+        return f"{slots}-slot schedule, {lessons} lessons"
+    if isinstance(value, list):
+        keys = sorted(value[0]) if value and isinstance(value[0], dict) else []
+        return f"{len(value)} items" + (f" ({', '.join(keys)})" if keys else "")
+    if isinstance(value, dict):
+        return f"object ({', '.join(sorted(value))})"
+    text = " ".join(text.split())
+    if len(text) <= 80:
+        return text
+    return f"{text[:60]}… ({len(text)} chars)"
+
+def digest_tool_result(block: dict) -> dict:
+    text = tool_result_text(block)
+    if text.startswith(TOOL_RESULT_PREFIX):
+        return block
+    return {**block, "content": [{"type": "text", "text": f"{TOOL_RESULT_PREFIX}{digest_text(text)}>"}]}
+
+def compact_tool_results(
+    history: list[BetaMessageParam],
+    keep_turns: int = 1
+) -> tuple[list[BetaMessageParam], int, int]:
+    """把最新 keep_turns 輪以前的 mcp_tool_result 換成簡短描述
+
+    回傳 (新的歷史, 節省的 bytes, 節省的估計 tokens)。已經摘要過的 block 不會重複處理。
+    """
+    user_indices = [i for i, m in enumerate(history) if m["role"] == "user"]
+    if keep_turns <= 0:
+        recent_from = len(history)
+    elif keep_turns <= len(user_indices):
+        recent_from = user_indices[-keep_turns]
+    else:
+        recent_from = 0
+
+    compacted = []
+    saved_bytes = 0
+    saved_tokens = 0
+    for i, message in enumerate(history):
+        content = message["content"]
+        if i >= recent_from or message["role"] != "assistant" or isinstance(content, str):
+            compacted.append(message)
+            continue
+        if not isinstance(content, list):
+            # 例如經 pydantic 驗證後的 ValidatorIterator，走訪之後就是空的。原樣保留，不影響這一輪的回覆
+            logger.warning(f"第 {i} 則訊息的 content 為 {type(content).__name__}，略過工具結果摘要")
+            compacted.append(message)
+            continue
+        blocks = []
+        for block in content:
+            if block.get("type") == "mcp_tool_result":
+                digested = digest_tool_result(block)
+                if digested is not block:
+                    before = json.dumps(block, ensure_ascii=False)
+                    after = json.dumps(digested, ensure_ascii=False)
+                    # 很短的結果 (例如「入社成功」) 維持原樣
+                    if len(after.encode()) < len(before.encode()):
+                        saved_bytes += len(before.encode()) - len(after.encode())
+                        saved_tokens += estimate_tokens(before) - estimate_tokens(after)
+                        block = digested
+            blocks.append(block)
+        compacted.append({**message, "content": blocks})
+    return compacted, saved_bytes, saved_tokens
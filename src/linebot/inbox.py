@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from mongo.MessageInbox import PendingMessageModel
+
+logger = logging.getLogger("linebot.inbox")
+
+class MessageInbox:
+    """每位用戶一份待處理訊息佇列 + 租約 (lease)
+
+    同一時間只有持有租約的 worker 會替該用戶呼叫 Claude；
+    處理期間新進的訊息只會放進 pending，由持有者合併成下一輪的 user 訊息。
+    租約存在 Mongo，因此跨 gunicorn worker 也成立，worker 當掉時租約會自然過期。
+    """
+
+    def __init__(self, collection: Collection, lease_seconds: float = 180):
+        self.collection = collection
+        self.lease = timedelta(seconds=lease_seconds)
+        self.owner_prefix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def push(self, line_user_id: str, text: str, reply_token: str, received_at: datetime | None = None):
+        """received_at: LINE 事件的時間，用來判斷 reply token 是否可能已過期"""
+        message = PendingMessageModel(text=text, reply_token=reply_token, received_at=received_at or datetime.now())
+        self.collection.update_one(
+            {"line_user_id": line_user_id},
+            {"$push": {"pending": message.model_dump()}},
+            upsert=True
+        )
+
+    def acquire(self, line_user_id: str) -> str | None:
+        """取得租約，成功時回傳 owner，已被其他 worker 持有則回傳 None"""
+        owner = f"{self.owner_prefix}-{uuid.uuid4().hex[:8]}"
+        now = datetime.now()
+        doc = self.collection.find_one_and_update(
+            {
+                "line_user_id": line_user_id,
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            {"$set": {"lease_owner": owner, "lease_until": now + self.lease}},
+            projection={"_id": 1}
+        )
+        return owner if doc else None
+
+    def take(self, line_user_id: str, owner: str) -> list[PendingMessageModel] | None:
+        """取出所有待處理訊息並延長租約，租約已遺失時回傳 None"""
+        doc = self.collection.find_one_and_update(
+            {"line_user_id": line_user_id, "lease_owner": owner},
+            {"$set": {"pending": [], "lease_until": datetime.now() + self.lease}},
+            projection={"_id": 0, "pending": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if doc is None:
+            return None
+        return [PendingMessageModel.model_validate(m) for m in doc.get("pending", [])]
+
+    def renew(self, line_user_id: str, owner: str) -> bool:
+        """延長租約，租約已被其他 worker 取得時回傳 False"""
+        result = self.collection.update_one(
+            {"line_user_id": line_user_id, "lease_owner": owner},
+            {"$set": {"lease_until": datetime.now() + self.lease}}
+        )
+        return result.matched_count == 1
+
+    def keep(self, line_user_id: str, owner: str) -> "LeaseKeeper":
+        """持有租約期間在背景定期延長，用法: `with inbox.keep(line_user_id, owner) as lease: ...`"""
+        return LeaseKeeper(self, line_user_id, owner, interval=self.lease.total_seconds() / 3)
+
+    def release(self, line_user_id: str, owner: str, force: bool = False) -> bool:
+        """釋放租約；若期間又有新訊息 (pending 非空) 則不釋放並回傳 False，除非 force"""
+        query = {"line_user_id": line_user_id, "lease_owner": owner}
+        if not force:
+            query["pending"] = {"$size": 0}
+        result = self.collection.update_one(query, {"$set": {"lease_owner": None, "lease_until": None}})
+        return result.modified_count == 1
+
+class LeaseKeeper:
+    """每 interval 秒延長一次租約，Claude 呼叫 (逾時 × 重試，加上摘要) 比租約還長時租約也不會過期
+
+    worker 當掉時不再延長，租約仍會在 lease_seconds 後過期。寫入對話歷史前以 `check()` 確認仍持有租約。
+    """
+
+    def __init__(self, inbox: MessageInbox, line_user_id: str, owner: str, interval: float):
+        self.inbox = inbox
+        self.line_user_id = line_user_id
+        self.owner = owner
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.line_user_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.inbox.renew(self.line_user_id, self.owner):
+                    self.lost = True
+                    logger.warning(f"用戶 {self.line_user_id} 的對話租約已被其他 worker 取得")
+                    return
+            except PyMongoError as e:
+                # 租約還有剩餘時間，下一次再試
+                logger.warning(f"延長用戶 {self.line_user_id} 的對話租約失敗: {e}")
+
+    def check(self) -> bool:
+        """立即延長一次並回傳是否仍持有租約"""
+        if not self.lost and not self.inbox.renew(self.line_user_id, self.owner):
+            self.lost = True
+        return not self.lost
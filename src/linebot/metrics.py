@@ -0,0 +1,89 @@
+"""Prometheus 指標與各階段的耗時紀錄
+
+`span(stage)` 記錄一個階段的耗時到 `linebot_stage_seconds`，同時累加到目前執行緒的 trace；
+`trace(label)` 包住一個事件的處理，結束時以一行 log 列出各階段耗時，方便在壓測時找出瓶頸。
+
+gunicorn 有多個 worker process，設定 PROMETHEUS_MULTIPROC_DIR 時 /metrics 會合併所有 worker 的數值
+(該目錄需在啟動前清空)。
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+logger = logging.getLogger("linebot.metrics")
+
+# Claude 呼叫可能長達數十秒，其他階段多在毫秒等級
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = Histogram("linebot_stage_seconds", "各處理階段的耗時", ["stage"], buckets=BUCKETS)
+CLAUDE_TTFT_SECONDS = Histogram(
+    "linebot_claude_ttft_seconds", "串流時收到第一個 content 事件的時間", ["model"], buckets=BUCKETS
+)
+CLAUDE_SECONDS = Histogram("linebot_claude_seconds", "Claude 呼叫的總耗時", ["model", "tier"], buckets=BUCKETS)
+CLAUDE_TOKENS = Counter("linebot_claude_tokens", "Claude token 用量", ["model", "kind"])
+CLAUDE_FALLBACKS = Counter("linebot_claude_fallbacks", "大模型超過延遲預算或 overloaded 而改用快速模型", ["reason"])
+CLAUDE_INTERRUPTED = Counter("linebot_claude_interrupted", "逾時或在工具呼叫開始後中斷、無法安全重送的 Claude 呼叫")
+EVENTS = Counter("linebot_events", "webhook 事件處理結果", ["result"])
+# queue 模式的佇列與背景工作執行緒，多個 worker 時為所有 process 的總和
+WEBHOOK_QUEUE_DEPTH = Gauge("linebot_webhook_queue_depth", "佇列中等待處理的事件數", multiprocess_mode="livesum")
+WEBHOOK_QUEUE_CAPACITY = Gauge("linebot_webhook_queue_capacity", "佇列的容量", multiprocess_mode="livesum")
+WEBHOOK_WORKERS = Gauge("linebot_webhook_workers", "背景工作執行緒數", multiprocess_mode="livesum")
+WEBHOOK_WORKERS_BUSY = Gauge("linebot_webhook_workers_busy", "正在處理事件的背景工作執行緒數", multiprocess_mode="livesum")
+WEBHOOK_REJECTED = Counter("linebot_webhook_rejected", "佇列已滿 (或正在關閉) 而以 503 拒絕的事件")
+# pymongo 連線池 (由 clients.PoolMonitor 更新)，多個 worker 時為所有 process 的總和
+MONGO_POOL_CAPACITY = Gauge("linebot_mongo_pool_capacity", "連線池可開啟的連線數上限 (每台 server 一個連線池)", multiprocess_mode="livesum")
+MONGO_POOL_OPEN = Gauge("linebot_mongo_pool_open", "開啟中的連線數", multiprocess_mode="livesum")
+MONGO_POOL_CHECKED_OUT = Gauge("linebot_mongo_pool_checked_out", "借出中的連線數", multiprocess_mode="livesum")
+MONGO_POOL_CHECKOUTS = Counter("linebot_mongo_pool_checkouts", "連線借出次數", ["result"])
+MONGO_POOL_WAIT_SECONDS = Histogram("linebot_mongo_pool_wait_seconds", "等待借出連線的時間", buckets=BUCKETS)
+MONGO_POOL_CLEARED = Counter("linebot_mongo_pool_cleared", "連線池因錯誤被清空的次數")
+
+_local = threading.local()
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+@contextmanager
+def trace(label: str):
+    """同一個執行緒內的 span 會被收集，結束時輸出一行摘要"""
+    _local.spans = {}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans, _local.spans = _local.spans, None
+        if spans:
+            total = (time.perf_counter() - start) * 1000
+            stages = " ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in spans.items())
+            logger.info(f"{label} 耗時 {total:.0f} ms: {stages}")
+
+def observe(stage: str, seconds: float):
+    """已經自行計時的階段 (例如包含例外處理的 Claude 呼叫)"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans[stage] = spans.get(stage, 0.0) + seconds
+
+def record_usage(model: str, usage):
+    CLAUDE_TOKENS.labels(model, "input").inc(usage.input_tokens)
+    CLAUDE_TOKENS.labels(model, "output").inc(usage.output_tokens)
+    CLAUDE_TOKENS.labels(model, "cache_read").inc(usage.cache_read_input_tokens or 0)
+    CLAUDE_TOKENS.labels(model, "cache_write").inc(usage.cache_creation_input_tokens or 0)
+
+def render() -> tuple[bytes, str]:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
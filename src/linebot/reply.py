@@ -0,0 +1,65 @@
+"""LINE 回覆的長度限制與讀取動畫
+
+一次 reply 最多 5 則訊息，每則文字訊息最多 5000 字。
+"""
+import logging
+import requests
+
+LINE_MAX_MESSAGES = 5
+LINE_MAX_CHARS = 5000
+TRUNCATED = "\n\n（回應過長已截斷）"
+# LINE 不接受空白的文字訊息
+EMPTY_REPLY = "<無回應>"
+LOADING_PATH = "/v2/bot/chat/loading/start"
+
+logger = logging.getLogger("linebot.reply")
+
+def split_reply(text: str, max_chars: int = LINE_MAX_CHARS, max_messages: int = LINE_MAX_MESSAGES) -> list[str]:
+    """盡量在段落或行 (清單項目) 之間切開，超過 max_messages 則的部分截斷"""
+    chunks: list[str] = []
+    current = ""
+    for line in text.split("\n"):
+        # 單行就超過上限時只能硬切
+        while len(line) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        chunks.append(current)
+        current = line
+    if current or not chunks:
+        chunks.append(current)
+
+    # 段落開頭的空行沒有意義
+    chunks = [chunk.strip("\n") for chunk in chunks if chunk.strip()] or [EMPTY_REPLY]
+    if len(chunks) > max_messages:
+        chunks = chunks[:max_messages]
+        chunks[-1] = chunks[-1][:max_chars - len(TRUNCATED)] + TRUNCATED
+    return chunks
+
+def show_loading(access_token: str, chat_id: str, seconds: int, endpoint: str = "https://api.line.me",
+                 session: requests.Session | None = None):
+    """顯示讀取動畫，送出訊息後動畫會自動消失。只有一對一聊天有效，失敗不影響回覆
+
+    session: 與 LINE API client 共用 keep-alive 連線
+    """
+    if seconds <= 0:
+        return
+    # loadingSeconds 必須是 5 ~ 60 之間 5 的倍數
+    seconds = min(60, max(5, seconds // 5 * 5))
+    try:
+        response = (session or requests).post(
+            endpoint + LOADING_PATH,
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={"chatId": chat_id, "loadingSeconds": seconds},
+            timeout=3
+        )
+        if response.status_code >= 400:
+            logger.warning(f"讀取動畫失敗: {response.status_code} {response.text}")
+    except requests.RequestException as e:
+        logger.warning(f"讀取動畫失敗: {e}")
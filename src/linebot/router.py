@@ -0,0 +1,150 @@
+"""不經過 Claude 的快速路徑
+
+斜線指令與少數固定說法 (中 / 英) 直接查詢 MongoDB 回答，例如「課表」、「我的資料」、"show schedule"。
+只有整句都符合規則時才會命中，其他訊息 (包含「我要報名」這類需要操作的訊息) 一律交給 Claude。
+回覆格式遵守 SYSTEM_PROMPT 的規定: 純文字、以 "•" 條列、時段使用台科大節次。
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable
+from pymongo.database import Database
+from mongo.format import format_available_time, schedule_lessons
+from mongo.schedule_cache import ScheduleCache
+from mongo.schema import OneOnOneFormModel, OneOnOneRole, UserModel, UserRole
+
+@dataclass
+class FastReply:
+    intent: str
+    text: str
+
+# 比對前移除的客套話與標點
+FILLER = re.compile(r"請問|請|幫我|麻煩|一下|please|pls|[\s?？!！。.,，~～、:：]+")
+
+# 意圖 → (斜線指令, 中文規則, 英文規則)，規則需與整句 (移除 FILLER 後) 完全相符
+INTENTS: dict[str, tuple[set[str], str, str]] = {
+    "schedule": (
+        {"/schedule", "/課表"},
+        r"(查詢?|查看|看|顯示|給我看?)?(目前|現在)?的?(一對一)?(教學)?課表(是什麼)?",
+        r"(show|get|see|view|check)?(me)?(the|current)?(oneonone|1on1|tutoring)?schedule|what'?sthe(tutoring)?schedule",
+    ),
+    "registration": (
+        {"/registration", "/報名"},
+        r"(查詢?|查看|看|顯示)(我的)?(一對一)?(教學)?報名(紀錄|記錄|資料|狀態)?"
+        r"|我的(一對一)?(教學)?報名(紀錄|記錄|資料|狀態)?|(一對一)?(教學)?報名(紀錄|記錄|狀態)",
+        r"(show|check|see|get)?my(registration|enrollment|signup)(status)?",
+    ),
+    "user_info": (
+        {"/me", "/我的資料"},
+        r"(查詢?|查看|看|顯示)?我的(個人)?(使用者|用戶|社員)?(資料|資訊)|我是誰",
+        r"(show|get|see)?my(info|information|profile|details)|whoami|what'?smyinfo",
+    ),
+    "help": (
+        {"/help", "/幫助", "/指令"},
+        r"指令|有哪些指令",
+        r"help|commands",
+    ),
+}
+
+ROLE_NAMES = {
+    UserRole.GENERAL: ("非社員", "Non-member"),
+    UserRole.MEMBER: ("社員", "Member"),
+    UserRole.ADMIN: ("幹部", "Officer"),
+}
+ONE_ON_ONE_ROLE_NAMES = {
+    OneOnOneRole.TEACHER: ("老師", "Teacher"),
+    OneOnOneRole.STUDENT: ("學生", "Student"),
+}
+
+def normalize(text: str) -> str:
+    return FILLER.sub("", text.strip().lower())
+
+def is_english(text: str) -> bool:
+    return text.isascii()
+
+def match_intent(text: str) -> str | None:
+    command = text.strip().lower()
+    for intent, (commands, zh, en) in INTENTS.items():
+        if command in commands:
+            return intent
+    normalized = normalize(text)
+    if not normalized or len(normalized) > 30:
+        return None
+    pattern = 2 if is_english(normalized) else 1
+    for intent, rules in INTENTS.items():
+        if re.fullmatch(rules[pattern], normalized):
+            return intent
+    return None
+
+class FastPathRouter:
+    def __init__(self, db: Database, schedule_cache: ScheduleCache):
+        self.db = db
+        self.schedule_cache = schedule_cache
+        self.handlers: dict[str, Callable[[UserModel, bool], str]] = {
+            "schedule": self.schedule,
+            "registration": self.registration,
+            "user_info": self.user_info,
+            "help": self.help,
+        }
+
+    def route(self, text: str, user: UserModel) -> FastReply | None:
+        intent = match_intent(text)
+        if intent is None:
+            return None
+        return FastReply(intent=intent, text=self.handlers[intent](user, is_english(text)))
+
+    def schedule(self, user: UserModel, en: bool) -> str:
+        schedule = self.schedule_cache.get(self.db.one_on_one_schedule)
+        if schedule is None:
+            return (
+                "There is no one-on-one tutoring schedule yet. Please wait for an officer to update it."
+                if en else "尚未有一對一教學課表，請等待幹部更新課表"
+            )
+        lessons = schedule_lessons(schedule)
+        if not lessons:
+            return "The schedule has no lessons yet." if en else "目前課表中沒有任何課程"
+        header = (
+            f"One-on-one tutoring schedule, {len(lessons)} lessons (teacher→student):"
+            if en else f"一對一教學課表，共 {len(lessons)} 堂 (老師→學生):"
+        )
+        return header + "\n" + "\n".join(f"• {lesson}" for lesson in lessons)
+
+    def registration(self, user: UserModel, en: bool) -> str:
+        if user.role == UserRole.GENERAL:
+            return (
+                "Only club members can register for one-on-one tutoring. Tell me your name and student ID to join the club."
+                if en else "加入鋼琴社後才能報名一對一教學，請告訴我你的名字與學號來入社"
+            )
+        doc = self.db.one_on_one_enroll.find_one({"line_user_id": user.line_user_id}, {"_id": 0})
+        if doc is None:
+            return "You have not registered for one-on-one tutoring." if en else "未找到報名紀錄"
+        form = OneOnOneFormModel.model_validate(doc)
+        role = ONE_ON_ONE_ROLE_NAMES[form.role][en]
+        available = format_available_time(form.available_time)
+        if en:
+            return f"Your one-on-one tutoring registration:\n• Role: {role}\n• Available: {available}"
+        return f"你的一對一教學報名:\n• 身分: {role}\n• 可上課時間: {available}"
+
+    def user_info(self, user: UserModel, en: bool) -> str:
+        role = ROLE_NAMES[user.role][en]
+        if en:
+            return f"• Name: {user.name or '(none)'}\n• Student ID: {user.student_id or '(none)'}\n• Status: {role}"
+        return f"• 名字: {user.name or '(無)'}\n• 學號: {user.student_id or '(無)'}\n• 身分: {role}"
+
+    def help(self, user: UserModel, en: bool) -> str:
+        if en:
+            return (
+                "Quick commands:\n"
+                "• /schedule: one-on-one tutoring schedule\n"
+                "• /registration: your one-on-one registration\n"
+                "• /me: your member info\n"
+                "• /clear: clear the conversation history\n"
+                "Anything else, just ask me."
+            )
+        return (
+            "快速指令:\n"
+            "• /課表: 一對一教學課表\n"
+            "• /報名: 你的一對一教學報名\n"
+            "• /我的資料: 你的社員資料\n"
+            "• /clear: 清除對話歷史\n"
+            "其他事情直接問我就可以了。"
+        )
@@ -0,0 +1,43 @@
+"""依每一輪的內容選擇模型
+
+- fast: 寒暄、道謝等簡短且不需要工具的訊息
+- large: 其他訊息，以及可能需要工具的訊息 (報名、課表、入社等關鍵字)、
+  或是上一輪 Claude 正在使用工具 / 提出問題 (使用者的「好」、「對」可能是在確認報名)
+
+large 超過延遲預算或回傳 overloaded (529) 時，改用 fast 重試一次。
+注意 prompt cache 依模型分開計算，切換模型的那一輪不會命中快取。
+"""
+import re
+from anthropic.types.beta import BetaMessageParam
+
+FAST = "fast"
+LARGE = "large"
+
+# 可能需要使用工具或需要較強推理的關鍵字
+TOOL_KEYWORDS = re.compile(
+    r"報名|課表|排課|時段|節|入社|社員|幹部|申請|核准|老師|學生|一對一|有空|時間|學號|名字|修改|取消|"
+    r"schedule|register|enrol|join|member|admin|officer|approve|teacher|student|tutor|available|time|slot|period",
+    re.IGNORECASE
+)
+
+def last_assistant_needs_followup(history: list[BetaMessageParam]) -> bool:
+    """上一則 assistant 訊息是否使用了工具，或以問句結尾"""
+    for message in reversed(history):
+        if message["role"] != "assistant":
+            continue
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        if any(block.get("type") == "mcp_tool_use" for block in content):
+            return True
+        texts = [block.get("text", "") for block in content if block.get("type") == "text"]
+        return bool(texts) and texts[-1].rstrip().endswith(("?", "？"))
+    return False
+
+def choose_tier(user_message: str, history: list[BetaMessageParam], max_fast_chars: int = 20) -> str:
+    """history: 不含這一輪 user 訊息的對話歷史"""
+    if len(user_message) > max_fast_chars or TOOL_KEYWORDS.search(user_message):
+        return LARGE
+    if last_assistant_needs_followup(history):
+        return LARGE
+    return FAST
@@ -0,0 +1,257 @@
+"""本地的 Anthropic Messages API stub
+
+只實作 linebot 用到的 POST /v1/messages，回傳固定格式的文字回應，
+並模擬 prompt caching 的計費方式: 以 cache_control 斷點切出前綴，
+前綴曾經出現過就算 cache_read，否則算 cache_creation。
+
+支援串流 (SSE)，並可模擬延遲、MCP 工具呼叫 (回應中包含 mcp_tool_use / mcp_tool_result) 與 overloaded 錯誤:
+--latency 是第一個 content 之前的等待 (TTFT)，--tool-rate 的比例會多一次工具呼叫並再等待 --tool-latency。
+
+    python src/loadtest/fake_anthropic.py --port 8080 --latency 1.5 --jitter 0.3 --tool-rate 0.3
+    ANTHROPIC_BASE_URL=http://localhost:8080
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CACHE_TTL = 300
+LOOKBACK = 20
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+def strip_cache_control(block):
+    if isinstance(block, dict):
+        return {k: v for k, v in block.items() if k != "cache_control"}
+    return block
+
+def prompt_blocks(body: dict) -> list:
+    """依照 API 的順序 (tools → system → messages) 攤平成 block 列表"""
+    blocks = [*body.get("tools", []), *body.get("mcp_servers", [])]
+    system = body.get("system", [])
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    blocks.extend(system)
+    for message in body.get("messages", []):
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        blocks.extend({"role": message["role"], **block} for block in content)
+    return blocks
+
+class PromptCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: dict[str, float] = {}
+
+    def account(self, body: dict) -> dict:
+        """回傳這次請求的 input / cache_read / cache_creation token 數"""
+        digest = hashlib.sha256()
+        total = 0
+        prefixes: list[tuple[str, int]] = [] # 每個 block 結尾的 (前綴 hash, 累計 token)
+        breakpoints: list[int] = []
+        for block in prompt_blocks(body):
+            text = json.dumps(strip_cache_control(block), ensure_ascii=False, sort_keys=True)
+            digest.update(text.encode())
+            total += estimate_tokens(text)
+            prefixes.append((digest.copy().hexdigest(), total))
+            if isinstance(block, dict) and "cache_control" in block:
+                breakpoints.append(len(prefixes) - 1)
+
+        now = time.monotonic()
+        read = 0
+        written = 0
+        with self.lock:
+            self.entries = {k: t for k, t in self.entries.items() if t > now}
+            # 和真正的 API 一樣，每個斷點往前最多找 20 個 block 的快取
+            for position in breakpoints:
+                for key, tokens in reversed(prefixes[max(0, position - LOOKBACK + 1):position + 1]):
+                    if key in self.entries:
+                        read = max(read, tokens)
+                        break
+            for position in breakpoints:
+                key, tokens = prefixes[position]
+                if tokens > read:
+                    written = tokens - read
+                self.entries[key] = now + CACHE_TTL
+        return {
+            "input_tokens": total - read - written,
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": written,
+        }
+
+class Handler(BaseHTTPRequestHandler):
+    server: "FakeAnthropicServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_event(self, event: dict):
+        data = f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.split("?")[0] != "/v1/messages":
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+
+        server = self.server
+        server.count("requests")
+        if random.random() < server.overload_rate:
+            server.count("overloaded")
+            self.send_json(529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}})
+            return
+
+        usage = self.server.cache.account(body)
+        blocks = server.content_blocks(body)
+        usage["output_tokens"] = sum(
+            estimate_tokens(block.get("text") or json.dumps(block, ensure_ascii=False)) for block in blocks
+        )
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": blocks,
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        }
+        if body.get("stream"):
+            self.stream(message)
+            return
+        time.sleep(server.delay(server.latency))
+        for block in blocks:
+            if block["type"] == "mcp_tool_result":
+                time.sleep(server.delay(server.tool_latency))
+        self.send_json(200, message)
+
+    def stream(self, message: dict):
+        server = self.server
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        try:
+            self.send_event({
+                "type": "message_start",
+                "message": {**message, "content": [], "stop_reason": None, "usage": {**message["usage"], "output_tokens": 1}}
+            })
+            time.sleep(server.delay(server.latency))
+            for index, block in enumerate(message["content"]):
+                if block["type"] == "text":
+                    self.send_event({"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}})
+                    text = block["text"]
+                    for i in range(0, len(text), server.chunk_chars):
+                        self.send_event({
+                            "type": "content_block_delta",
+                            "index": index,
+                            "delta": {"type": "text_delta", "text": text[i:i + server.chunk_chars]}
+                        })
+                        time.sleep(server.chunk_delay)
+                else:
+                    if block["type"] == "mcp_tool_result":
+                        time.sleep(server.delay(server.tool_latency))
+                    self.send_event({"type": "content_block_start", "index": index, "content_block": block})
+                self.send_event({"type": "content_block_stop", "index": index})
+            self.send_event({
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": message["usage"]["output_tokens"]}
+            })
+            self.send_event({"type": "message_stop"})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 用戶端提前停止串流 (回覆長度上限)
+            server.count("stream_aborted")
+
+class FakeAnthropicServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, verbose: bool = False, jitter: float = 0.0,
+                 tool_rate: float = 0.0, tool_latency: float = 0.5, overload_rate: float = 0.0,
+                 output_chars: int = 120, chunk_chars: int = 20, chunk_delay: float = 0.0):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.verbose = verbose
+        self.jitter = jitter
+        self.tool_rate = tool_rate
+        self.tool_latency = tool_latency
+        self.overload_rate = overload_rate
+        self.output_chars = output_chars
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay = chunk_delay
+        self.cache = PromptCache()
+        self.lock = threading.Lock()
+        self.counters: dict[str, int] = {}
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def delay(self, seconds: float) -> float:
+        """以 ±jitter 的比例隨機調整延遲"""
+        return max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def content_blocks(self, body: dict) -> list[dict]:
+        blocks = []
+        servers = body.get("mcp_servers") or [{"name": "stub"}]
+        if random.random() < self.tool_rate:
+            self.count("tool_calls")
+            tool_use_id = f"mcptoolu_{uuid.uuid4().hex[:24]}"
+            blocks.append({
+                "type": "mcp_tool_use",
+                "id": tool_use_id,
+                "name": "get_user_info",
+                "server_name": servers[0]["name"],
+                "input": {}
+            })
+            blocks.append({
+                "type": "mcp_tool_result",
+                "tool_use_id": tool_use_id,
+                "is_error": False,
+                "content": [{"type": "text", "text": "• 名字: 測試\n• 學號: B00000000\n• 身分: 社員"}]
+            })
+        text = "這是本地 stub 的回應。"
+        blocks.append({"type": "text", "text": (text * (self.output_chars // len(text) + 1))[:self.output_chars]})
+        return blocks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="第一個 content 之前的延遲 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延遲隨機浮動的比例，例如 0.3 為 ±30%%")
+    parser.add_argument("--tool-rate", type=float, default=0.0, help="回應中包含一次 MCP 工具呼叫的比例")
+    parser.add_argument("--tool-latency", type=float, default=0.5, help="每次工具呼叫額外的延遲 (秒)")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="回傳 529 overloaded 的比例")
+    parser.add_argument("--output-chars", type=int, default=120, help="文字回應的長度")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="串流時每段文字之間的延遲 (秒)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(
+        (args.host, args.port), latency=args.latency, verbose=args.verbose, jitter=args.jitter,
+        tool_rate=args.tool_rate, tool_latency=args.tool_latency, overload_rate=args.overload_rate,
+        output_chars=args.output_chars, chunk_delay=args.chunk_delay
+    )
+    print(f"fake anthropic listening on {args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,138 @@
+"""本地的 LINE Messaging API stub
+
+實作 linebot 用到的 reply、push 與讀取動畫 API，記錄每個回覆收到的時間，供 linebot_load.py 計算端到端延遲。
+reply token 只能使用一次，且超過 --reply-token-ttl 秒會以 400 拒絕 (和真正的 API 一樣)。
+strict 模式下 reply token 需要先以 `issue(reply_token, line_user_id)` 登記才會被接受。
+
+    python src/loadtest/fake_line.py --port 8090
+    LINE_API_ENDPOINT=http://localhost:8090
+"""
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+@dataclass
+class Delivery:
+    line_user_id: str
+    received_at: float # time.monotonic()
+    texts: list[str]
+    reply_token: str | None = None # push message 為 None
+
+@dataclass
+class ReplyToken:
+    line_user_id: str
+    issued_at: float
+    used: bool = False
+
+@dataclass
+class LineStats:
+    replies: int = 0
+    pushes: int = 0
+    loading: int = 0
+    invalid_tokens: int = 0
+    deliveries: list[Delivery] = field(default_factory=list)
+
+class Handler(BaseHTTPRequestHandler):
+    server: "FakeLineServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0]
+        time.sleep(self.server.latency)
+        match path:
+            case "/v2/bot/message/reply":
+                error = self.server.reply(body["replyToken"], [m.get("text", "") for m in body["messages"]])
+                if error:
+                    self.send_json(400, {"message": error})
+                    return
+            case "/v2/bot/message/push":
+                self.server.push(body["to"], [m.get("text", "") for m in body["messages"]])
+            case "/v2/bot/chat/loading/start":
+                with self.server.lock:
+                    self.server.stats.loading += 1
+                self.send_json(202, {})
+                return
+            case _:
+                self.send_json(404, {"message": f"Not found: {path}"})
+                return
+        self.send_json(200, {})
+
+class FakeLineServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, reply_token_ttl: float = 60.0, strict: bool = True,
+                 verbose: bool = False):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.strict = strict
+        self.reply_token_ttl = reply_token_ttl
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.tokens: dict[str, ReplyToken] = {}
+        self.stats = LineStats()
+        self.delivered = threading.Condition(self.lock)
+
+    def issue(self, reply_token: str, line_user_id: str):
+        with self.lock:
+            self.tokens[reply_token] = ReplyToken(line_user_id=line_user_id, issued_at=time.monotonic())
+
+    def reply(self, reply_token: str, texts: list[str]) -> str | None:
+        """回傳錯誤訊息，成功時回傳 None"""
+        now = time.monotonic()
+        with self.lock:
+            token = self.tokens.get(reply_token)
+            if token is None and not self.strict:
+                token = self.tokens[reply_token] = ReplyToken(line_user_id="", issued_at=now)
+            if token is None or token.used or now - token.issued_at > self.reply_token_ttl:
+                self.stats.invalid_tokens += 1
+                return "Invalid reply token"
+            token.used = True
+            self.stats.replies += 1
+            self.stats.deliveries.append(Delivery(token.line_user_id, now, texts, reply_token))
+            self.delivered.notify_all()
+        return None
+
+    def push(self, line_user_id: str, texts: list[str]):
+        with self.lock:
+            self.stats.pushes += 1
+            self.stats.deliveries.append(Delivery(line_user_id, time.monotonic(), texts))
+            self.delivered.notify_all()
+
+    def reset(self) -> LineStats:
+        with self.lock:
+            stats, self.stats = self.stats, LineStats()
+            self.tokens.clear()
+        return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0, help="每個 API 呼叫的固定延遲 (秒)")
+    parser.add_argument("--reply-token-ttl", type=float, default=60.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeLineServer(
+        (args.host, args.port), latency=args.latency, reply_token_ttl=args.reply_token_ttl, strict=False,
+        verbose=args.verbose
+    )
+    print(f"fake LINE API listening on {args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,337 @@
+"""linebot 壓力測試
+
+送出帶有正確 X-Line-Signature 的 webhook 到 /callback，並以本地的 stub 取代外部服務:
+LINE API (fake_line.py，同一個 process 內啟動)、Anthropic (fake_anthropic.py) 與 mongod (暫存目錄)。
+依 --configs 逐一以不同的 gunicorn worker / thread 數啟動 linebot，輸出每組設定的:
+
+- callback: webhook 請求的延遲與錯誤率 (inline 模式包含處理時間)
+- reply: 從送出 webhook 到 LINE 收到回覆的端到端延遲；合併成同一輪的訊息以回覆的時間計算
+- unanswered / error_replies: 沒有收到回覆、或收到錯誤訊息的比例
+- stages_ms: linebot /metrics 中各階段的平均耗時
+
+    python src/loadtest/linebot_load.py --configs 1x8 4x8 4x16 --users 50 --webhooks 200 \\
+        --claude-latency 1.5 --tool-rate 0.3 --env WEBHOOK_MODE=queue
+
+已有執行中的 linebot (LINE_API_ENDPOINT 需指向 --line-port) 時改用 --url，只送出 webhook:
+
+    python src/loadtest/linebot_load.py --url http://localhost:5000/callback --secret $LINE_CHANNEL_SECRET
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+from pymongo import MongoClient
+from fake_anthropic import FakeAnthropicServer
+from fake_line import FakeLineServer, LineStats
+from report import percentile, print_summary, summarize
+
+SRC = Path(__file__).resolve().parent.parent
+SECRET = "loadtest-channel-secret"
+
+# 會交給 Claude 的訊息，以及會命中快速路徑的訊息
+CLAUDE_MESSAGES = ["你好", "我想報名一對一教學", "星期三下午有空嗎？", "社團什麼時候練琴", "謝謝"]
+FAST_MESSAGES = ["/課表", "我的資料", "/help"]
+ERROR_REPLIES = ("抱歉，系統發生錯誤", "Claude API 錯誤")
+
+@dataclass
+class Sent:
+    line_user_id: str
+    reply_token: str
+    sent_at: float # time.monotonic()
+    answered_at: float | None = None
+
+def sign(secret: str, body: str) -> str:
+    return base64.b64encode(hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest()).decode()
+
+def text_event(line_user_id: str, text: str, reply_token: str) -> dict:
+    return {
+        "type": "message",
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": line_user_id},
+        "webhookEventId": uuid.uuid4().hex.upper()[:26],
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": reply_token,
+        "message": {"id": str(random.randrange(10**17, 10**18)), "type": "text", "text": text},
+    }
+
+def send_webhooks(url: str, secret: str, line: FakeLineServer, args) -> tuple[dict, list[Sent]]:
+    users = [f"U{random.getrandbits(128):032x}" for _ in range(args.users)]
+    sent: list[Sent] = []
+    sent_lock = threading.Lock()
+    latencies: list[float] = []
+    errors: list[str] = []
+    local = threading.local()
+
+    def post(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        events, batch = [], []
+        for line_user_id in random.sample(users, min(args.events_per_webhook, len(users))):
+            reply_token = uuid.uuid4().hex
+            text = random.choice(FAST_MESSAGES if random.random() < args.fast_ratio else CLAUDE_MESSAGES)
+            line.issue(reply_token, line_user_id)
+            events.append(text_event(line_user_id, text, reply_token))
+            batch.append(Sent(line_user_id, reply_token, 0.0))
+        body = json.dumps({"destination": "Uloadtest", "events": events}, ensure_ascii=False)
+        start = time.monotonic()
+        for item in batch:
+            item.sent_at = start
+        with sent_lock:
+            sent.extend(batch)
+        try:
+            response = session.post(
+                url, data=body.encode(), timeout=args.timeout,
+                headers={"Content-Type": "application/json", "X-Line-Signature": sign(secret, body)}
+            )
+            if response.status_code != 200:
+                errors.append(f"HTTP {response.status_code}")
+                return
+            latencies.append(time.monotonic() - start)
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(post, range(args.webhooks)))
+    elapsed = time.perf_counter() - start
+    summary = summarize(latencies, len(errors), elapsed)
+    if errors:
+        summary["first_error"] = errors[0]
+    return summary, sent
+
+def match_deliveries(sent: list[Sent], stats: LineStats):
+    """回覆的 token 對應到一則訊息，該用戶在它之前送出且尚未回覆的訊息 (已合併成同一輪) 一併視為已回覆"""
+    by_token = {item.reply_token: item for item in sent}
+    by_user: dict[str, list[Sent]] = {}
+    for item in sent:
+        by_user.setdefault(item.line_user_id, []).append(item)
+    for delivery in sorted(stats.deliveries, key=lambda d: d.received_at):
+        if delivery.reply_token is not None:
+            answered = by_token.get(delivery.reply_token)
+            if answered is None:
+                continue
+            cutoff = answered.sent_at
+            line_user_id = answered.line_user_id
+        else:
+            cutoff = delivery.received_at
+            line_user_id = delivery.line_user_id
+        for item in by_user.get(line_user_id, []):
+            if item.answered_at is None and item.sent_at <= cutoff:
+                item.answered_at = delivery.received_at
+
+def wait_for_replies(line: FakeLineServer, sent: list[Sent], drain_timeout: float) -> LineStats:
+    deadline = time.monotonic() + drain_timeout
+    with line.lock:
+        while True:
+            for item in sent:
+                item.answered_at = None
+            match_deliveries(sent, line.stats)
+            remaining = deadline - time.monotonic()
+            if all(item.answered_at is not None for item in sent) or remaining <= 0:
+                break
+            line.delivered.wait(min(remaining, 1.0))
+    return line.reset()
+
+def reply_summary(sent: list[Sent], stats: LineStats) -> dict:
+    latencies = [item.answered_at - item.sent_at for item in sent if item.answered_at is not None]
+    error_replies = sum(any(text.startswith(ERROR_REPLIES) for text in d.texts) for d in stats.deliveries)
+    unanswered = len(sent) - len(latencies)
+    return {
+        "messages": len(sent),
+        "unanswered": unanswered,
+        "unanswered_rate": unanswered / len(sent) if sent else 0.0,
+        "error_replies": error_replies,
+        "error_reply_rate": error_replies / len(stats.deliveries) if stats.deliveries else 0.0,
+        "replies": stats.replies,
+        "pushes": stats.pushes,
+        "invalid_reply_tokens": stats.invalid_tokens,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+def scrape_stages(metrics_url: str) -> dict:
+    """linebot_stage_seconds 各階段的平均耗時 (毫秒)"""
+    try:
+        text = requests.get(metrics_url, timeout=5).text
+    except requests.RequestException:
+        return {}
+    sums: dict[str, float] = {}
+    counts: dict[str, float] = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != "linebot_stage_seconds":
+            continue
+        for sample in family.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_sum"):
+                sums[stage] = sums.get(stage, 0.0) + sample.value
+            elif sample.name.endswith("_count"):
+                counts[stage] = counts.get(stage, 0.0) + sample.value
+    return {stage: round(sums[stage] / counts[stage] * 1000, 1) for stage in sums if counts.get(stage)}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until(check, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"等待 {what} 逾時")
+
+def start_mongod(mongod: str, workdir: Path) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    dbpath = workdir / "mongo"
+    dbpath.mkdir()
+    process = subprocess.Popen(
+        [mongod, "--dbpath", str(dbpath), "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet",
+         "--logpath", str(workdir / "mongod.log")],
+    )
+    uri = f"mongodb://127.0.0.1:{port}"
+    with MongoClient(uri, serverSelectionTimeoutMS=500) as client:
+        wait_until(lambda: client.admin.command("ping"), 30, "mongod")
+    return process, uri
+
+def start_linebot(workers: int, threads: int, workdir: Path, env: dict, verbose: bool = False) -> tuple[subprocess.Popen, str]:
+    """linebot 以 app.xxx 的方式 import 自己的模組，和 Dockerfile 一樣把 linebot 放在 app/ 之下"""
+    root = workdir / "linebot-root"
+    if not root.exists():
+        root.mkdir()
+        (root / "app").symlink_to(SRC / "linebot")
+        (root / "mongo").symlink_to(SRC / "mongo")
+    metrics_dir = workdir / f"prometheus-{workers}x{threads}"
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    metrics_dir.mkdir()
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", str(threads),
+         "-b", f"127.0.0.1:{port}", "app.app:app"],
+        cwd=root,
+        env={**os.environ, **env, "PYTHONPATH": str(root), "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir)},
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=None if verbose else subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    wait_until(lambda: requests.get(f"{base}/health", timeout=1).status_code == 200, 60, "linebot")
+    return process, base
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def run(url: str, secret: str, line: FakeLineServer, args) -> dict:
+    callback, sent = send_webhooks(url, secret, line, args)
+    stats = wait_for_replies(line, sent, args.drain_timeout)
+    return {"callback": callback, "reply": reply_summary(sent, stats)}
+
+def main(args):
+    line = FakeLineServer(("127.0.0.1", args.line_port), latency=args.line_latency)
+    threading.Thread(target=line.serve_forever, daemon=True).start()
+
+    if args.url:
+        print_summary(args.url, run(args.url, args.secret, line, args))
+        return
+
+    anthropic = FakeAnthropicServer(
+        ("127.0.0.1", 0), latency=args.claude_latency, jitter=args.jitter, tool_rate=args.tool_rate,
+        tool_latency=args.tool_latency, overload_rate=args.overload_rate
+    )
+    threading.Thread(target=anthropic.serve_forever, daemon=True).start()
+
+    workdir = Path(tempfile.mkdtemp(prefix="linebot-load-"))
+    mongod = None
+    try:
+        mongo_uri = args.mongo_uri
+        if mongo_uri is None:
+            mongod, mongo_uri = start_mongod(args.mongod, workdir)
+        env = {
+            "MONGO_URI": mongo_uri,
+            "LINE_CHANNEL_SECRET": SECRET,
+            "LINE_CHANNEL_ACCESS_TOKEN": "loadtest",
+            "LINE_API_ENDPOINT": f"http://127.0.0.1:{line.server_address[1]}",
+            "ANTHROPIC_API_KEY": "loadtest",
+            "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{anthropic.server_address[1]}",
+            "NGROK_DOMAIN": "localhost",
+            **dict(item.split("=", 1) for item in args.env),
+        }
+        results = {}
+        for config in args.configs:
+            workers, threads = (int(n) for n in config.split("x"))
+            with MongoClient(mongo_uri) as client:
+                # 每組設定都從空的資料庫開始，避免前一組的對話歷史影響結果
+                client.drop_database("piano-club")
+            process, base = start_linebot(workers, threads, workdir, env, args.verbose)
+            try:
+                result = run(f"{base}/callback", SECRET, line, args)
+                result["stages_ms"] = scrape_stages(f"{base}/metrics")
+            finally:
+                stop(process)
+            print_summary(f"gunicorn -w {workers} --threads {threads}", result)
+            results[config] = result
+
+        print("== 總表")
+        print(f"{'config':>8} {'rps':>7} {'cb p95':>8} {'cb err':>7} {'reply p50':>10} {'reply p95':>10} {'reply p99':>10} {'unanswered':>10}")
+        for config, result in results.items():
+            callback, reply = result["callback"], result["reply"]
+            print(
+                f"{config:>8} {callback['throughput_rps']:>7.1f} {callback['p95_ms']:>8.0f} {callback['error_rate']:>7.1%} "
+                f"{reply['p50_ms']:>10.0f} {reply['p95_ms']:>10.0f} {reply['p99_ms']:>10.0f} {reply['unanswered_rate']:>10.1%}"
+            )
+        print(f"fake anthropic: {anthropic.counters}")
+    finally:
+        if mongod is not None:
+            stop(mongod)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", default=["1x8", "4x8"], help="gunicorn 的 workers x threads")
+    parser.add_argument("--url", help="改為對已在執行的 linebot 送出 webhook")
+    parser.add_argument("--secret", default=SECRET, help="--url 時使用的 channel secret")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--webhooks", type=int, default=200)
+    parser.add_argument("--events-per-webhook", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16, help="同時送出的 webhook 數")
+    parser.add_argument("--fast-ratio", type=float, default=0.2, help="命中快速路徑的訊息比例")
+    parser.add_argument("--timeout", type=float, default=120, help="webhook 請求逾時 (秒)")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="送完後等待回覆的時間 (秒)")
+    parser.add_argument("--claude-latency", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--tool-rate", type=float, default=0.3)
+    parser.add_argument("--tool-latency", type=float, default=0.5)
+    parser.add_argument("--overload-rate", type=float, default=0.0)
+    parser.add_argument("--line-port", type=int, default=8090)
+    parser.add_argument("--line-latency", type=float, default=0.05)
+    parser.add_argument("--mongod", default="mongod", help="mongod 執行檔")
+    parser.add_argument("--mongo-uri", help="使用既有的 MongoDB，不另外啟動 mongod (資料庫 piano-club 會被清空)")
+    parser.add_argument("--env", nargs="*", default=[], help="額外傳給 linebot 的環境變數，例如 WEBHOOK_MODE=queue")
+    parser.add_argument("--verbose", action="store_true", help="顯示 linebot 的輸出")
+    main(parser.parse_args())
@@ -0,0 +1,76 @@
+"""MCP server 併發測試
+
+以多個 MCP session 同時呼叫同一個工具，量測延遲與吞吐量。
+可以用 --background-tool 讓另一個 session 持續呼叫慢工具 (例如更新課表)，
+觀察它是否拖慢其他 session (同步 Mongo client 會把所有 session 串在一起)。
+
+    python src/loadtest/mcp_concurrency.py --url http://localhost:8000/mcp \\
+        --sessions 32 --calls 20 --tool get_one_on_one_tutoring_schedule \\
+        --background-tool update_one_on_one_tutoring_schedule --background-user U185a46e21c14044575e4a064a1719a43
+"""
+import argparse
+import asyncio
+import json
+import time
+from fastmcp import Client
+from fastmcp.client.transports import StreamableHttpTransport
+from report import summarize, print_summary
+
+def make_client(url: str, line_user_id: str) -> Client:
+    return Client(StreamableHttpTransport(url, headers={"Authorization": f"Bearer {line_user_id}"}))
+
+async def session(url: str, line_user_id: str, tool: str, arguments: dict, calls: int,
+                  latencies: list[float], errors: list[Exception]):
+    async with make_client(url, line_user_id) as client:
+        for _ in range(calls):
+            start = time.perf_counter()
+            try:
+                await client.call_tool(tool, arguments)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(e)
+
+async def background(url: str, line_user_id: str, tool: str, stop: asyncio.Event) -> int:
+    count = 0
+    async with make_client(url, line_user_id) as client:
+        while not stop.is_set():
+            await client.call_tool(tool, {})
+            count += 1
+    return count
+
+async def main(args):
+    arguments = json.loads(args.arguments)
+    latencies: list[float] = []
+    errors: list[Exception] = []
+
+    stop = asyncio.Event()
+    background_task = None
+    if args.background_tool:
+        background_task = asyncio.create_task(
+            background(args.url, args.background_user, args.background_tool, stop)
+        )
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        session(args.url, f"U{i:032x}", args.tool, arguments, args.calls, latencies, errors)
+        for i in range(args.sessions)
+    ])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    if background_task is not None:
+        print(f"background calls: {await background_task}")
+    if errors:
+        print(f"first error: {errors[0]!r}")
+    print_summary(f"{args.tool} x {args.sessions} sessions", summarize(latencies, len(errors), elapsed))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/mcp")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--tool", default="get_one_on_one_tutoring_schedule")
+    parser.add_argument("--arguments", default="{}", help="工具參數 (JSON)")
+    parser.add_argument("--background-tool")
+    parser.add_argument("--background-user", default="U185a46e21c14044575e4a064a1719a43")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,29 @@
+"""壓力測試腳本共用的統計輸出"""
+import json
+import statistics
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """latencies 以秒為單位，輸出以毫秒為單位"""
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+def print_summary(title: str, summary: dict):
+    print(f"== {title}")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
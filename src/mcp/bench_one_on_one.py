@@ -0,0 +1,184 @@
+"""一對一排課的效能測試
+
+以合成資料測試各排課引擎，可調整學生 / 老師人數、可上課時間密度、老師可教人數，
+以及集中在少數時段的偏斜分布 (例如「大家都只有週三下午有空」)。
+每個組合記錄建圖時間、求解時間、尖峰記憶體與配對數，結果存成 JSON 以便比較不同版本:
+
+    python bench_one_on_one.py --students 100 1000 10000 --teachers 50 500 5000 --output new.json
+    python bench_one_on_one.py --compare old.json new.json
+
+加上 --profile 會另外以 cProfile 跑一次並存下 .prof 檔。
+"""
+import argparse
+import cProfile
+import gc
+import itertools
+import json
+import platform
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable
+
+import one_on_one
+import one_on_one_bitset
+
+N_SECTIONS = 98 # 7 天 × 14 節
+# 週三下午 (W5 ~ W9)
+HOTSPOT = [2 * 14 + p for p in range(4, 9)]
+
+def random_mask(rng: random.Random, density: float, skew: float) -> int:
+    """skew 比例的人只在熱門時段有空，其餘的人每個時段以 density 的機率有空"""
+    if rng.random() < skew:
+        return sum(1 << k for k in HOTSPOT if rng.random() < 0.8) or 1 << rng.choice(HOTSPOT)
+    return sum(1 << k for k in range(N_SECTIONS) if rng.random() < density) or 1 << rng.randrange(N_SECTIONS)
+
+def make_population(
+    n_students: int, n_teachers: int,
+    density: float = 0.1, max_students: int = 1, skew: float = 0.0,
+    seed: int = 0
+) -> tuple[list[int], list[int], list[int]]:
+    rng = random.Random(seed)
+    students = [random_mask(rng, density, skew) for _ in range(n_students)]
+    teachers = [random_mask(rng, density, skew) for _ in range(n_teachers)]
+    return students, teachers, [max_students] * n_teachers
+
+def mask_to_set(mask: int) -> set[int]:
+    return set(one_on_one_bitset.iter_bits(mask))
+
+def run_bitset(students, teachers, capacity, timings) -> int:
+    start = time.perf_counter()
+    result = one_on_one_bitset.schedule_masks(students, teachers, capacity, N_SECTIONS, timings=timings)
+    timings["total"] = time.perf_counter() - start
+    return len(result)
+
+def run_ortools(students, teachers, capacity, timings) -> int:
+    # 轉換成 pydantic 模型的時間不計入
+    student_models = [one_on_one.Student(obj=i, available_time=mask_to_set(m)) for i, m in enumerate(students)]
+    teacher_models = [
+        one_on_one.Teacher(obj=j, available_time=mask_to_set(m), max_students=c)
+        for j, (m, c) in enumerate(zip(teachers, capacity))
+    ]
+    start = time.perf_counter()
+    result = one_on_one.schedule(student_models, teacher_models, timings=timings)
+    timings["total"] = time.perf_counter() - start
+    return len(result)
+
+ENGINES: dict[str, Callable] = {
+    "bitset": run_bitset,
+    "ortools": run_ortools,
+}
+
+def measure(engine: str, population, repeat: int) -> dict:
+    run = ENGINES[engine]
+    best: dict | None = None
+    for _ in range(repeat):
+        gc.collect()
+        timings: dict[str, float] = {}
+        size = run(*population, timings)
+        total = timings["total"]
+        if best is None or total < best["total_s"]:
+            best = {
+                "total_s": total,
+                "build_s": timings.get("build", 0.0),
+                "solve_s": timings.get("solve", 0.0),
+                "matching_size": size,
+                **({"augmentations": timings["augmentations"]} if "augmentations" in timings else {}),
+            }
+
+    # 尖峰記憶體另外量測，tracemalloc 本身會拖慢執行
+    gc.collect()
+    tracemalloc.start()
+    run(*population, {})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best["peak_memory_bytes"] = peak
+    return best
+
+def profile(engine: str, population, path: str):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    ENGINES[engine](*population, {})
+    profiler.disable()
+    profiler.dump_stats(path)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+def case_key(case: dict) -> str:
+    return json.dumps({"engine": case["engine"], **case["params"]}, sort_keys=True)
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    with open(old_path) as f:
+        old = {case_key(c): c for c in json.load(f)["cases"]}
+    with open(new_path) as f:
+        new = {case_key(c): c for c in json.load(f)["cases"]}
+    regressions = 0
+    print(f"{'case':<90} {'old':>10} {'new':>10} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        ratio = n["total_s"] / o["total_s"] if o["total_s"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  ← 變慢"
+            regressions += 1
+        if n["matching_size"] != o["matching_size"]:
+            flag += f"  ← 配對數不同 ({o['matching_size']} → {n['matching_size']})"
+            regressions += 1
+        print(f"{key:<90} {o['total_s']:>9.4f}s {n['total_s']:>9.4f}s {ratio:>6.2f}x{flag}")
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--students", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--teachers", nargs="+", type=int, default=[5, 50, 500])
+    parser.add_argument("--density", nargs="+", type=float, default=[0.05, 0.2], help="每個時段有空的機率")
+    parser.add_argument("--max-students", nargs="+", type=int, default=[1])
+    parser.add_argument("--skew", nargs="+", type=float, default=[0.0, 0.8], help="只在熱門時段有空的人數比例")
+    parser.add_argument("--paired", action="store_true", help="--students 與 --teachers 一對一搭配，而非所有組合")
+    parser.add_argument("--repeat", type=int, default=3, help="每個組合執行幾次取最快")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", action="store_true", help="每個組合另外以 cProfile 執行並存檔")
+    parser.add_argument("--output", help="結果 JSON 檔")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="比較兩次的結果")
+    parser.add_argument("--threshold", type=float, default=1.2, help="比較時，變慢超過幾倍視為退步")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    sizes = zip(args.students, args.teachers) if args.paired else itertools.product(args.students, args.teachers)
+    cases = []
+    for (n_students, n_teachers), density, max_students, skew in itertools.product(
+        list(sizes), args.density, args.max_students, args.skew
+    ):
+        params = {
+            "students": n_students, "teachers": n_teachers, "density": density,
+            "max_students": max_students, "skew": skew, "seed": args.seed,
+        }
+        population = make_population(n_students, n_teachers, density, max_students, skew, args.seed)
+        for engine in args.engines:
+            result = measure(engine, population, args.repeat)
+            cases.append({"engine": engine, "params": params, **result})
+            print(
+                f"{engine:<8} S={n_students:<6} T={n_teachers:<6} d={density:<5} cap={max_students} skew={skew:<4} "
+                f"build={result['build_s']:.4f}s solve={result['solve_s']:.4f}s total={result['total_s']:.4f}s "
+                f"peak={result['peak_memory_bytes'] / 1e6:.1f}MB matched={result['matching_size']}"
+            )
+            if args.profile:
+                path = f"profile-{engine}-{n_students}x{n_teachers}-d{density}-c{max_students}-s{skew}.prof"
+                profile(engine, population, path)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": cases,
+            }, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""比較工具結果在 JSON 與精簡文字 (MCP_OUTPUT_FORMAT=compact) 下的 token 數與延遲
+
+以合成的報名資料產生課表，分別以兩種格式輸出各工具的結果。JSON 的序列化方式與 FastMCP 相同。
+
+    python bench_tool_output.py --students 40 --teachers 20
+    python bench_tool_output.py --count-tokens          # 以 Anthropic API 的 count_tokens 計算
+    python bench_tool_output.py --claude 5              # 每種格式實際呼叫 Claude 5 次，比較延遲
+
+--count-tokens 與 --claude 需要安裝 anthropic 並設定 ANTHROPIC_API_KEY，
+也可以設定 ANTHROPIC_BASE_URL 指向 src/loadtest/fake_anthropic.py。
+"""
+import argparse
+import random
+import statistics
+import time
+import pydantic_core
+from mongo.format import format_form, format_forms, format_schedule, format_user
+from mongo.schema import (
+    CLASS_PERIOD, WEEKDAYS, OneOnOneFormModel, OneOnOneRole, ScheduleModel, UserModel, UserRole
+)
+from mongo.tokens import estimate_tokens
+from schedule_jobs import solve_masks
+
+SECTIONS = [(w, p) for w in WEEKDAYS for p in CLASS_PERIOD]
+SURNAMES = "王李張劉陳楊黃趙吳周"
+GIVEN = ["小明", "大華", "怡君", "家豪", "雅婷", "志偉", "淑芬", "俊傑"]
+QUESTION = "以下是工具的回傳結果，請用一句話回答: 星期三有幾堂課?"
+
+def make_data(n_students: int, n_teachers: int, seed: int):
+    rng = random.Random(seed)
+    users, forms = [], []
+    for i in range(n_students + n_teachers):
+        line_user_id = f"U{rng.getrandbits(128):032x}"
+        users.append(UserModel(
+            line_user_id=line_user_id,
+            student_id=f"B{rng.randrange(10**8):08d}",
+            name=rng.choice(SURNAMES) + rng.choice(GIVEN),
+            role=UserRole.MEMBER
+        ))
+        # 一天中連續幾節有空，比較接近真實的可上課時間
+        available = set()
+        for weekday in rng.sample(WEEKDAYS[:5], rng.randint(1, 3)):
+            start = rng.randrange(len(CLASS_PERIOD) - 3)
+            available |= {(weekday, p) for p in CLASS_PERIOD[start:start + rng.randint(2, 4)]}
+        forms.append(OneOnOneFormModel(
+            line_user_id=line_user_id,
+            role=OneOnOneRole.STUDENT if i < n_students else OneOnOneRole.TEACHER,
+            available_time=available
+        ))
+
+    students, teachers = forms[:n_students], forms[n_students:]
+    def mask(form):
+        return sum(1 << SECTIONS.index(s) for s in form.available_time)
+    pairs, _ = solve_masks("bitset", [mask(f) for f in students], [mask(f) for f in teachers], len(SECTIONS))
+    names = {u.line_user_id: u.name for u in users}
+    schedule = {w: {p: None for p in CLASS_PERIOD} for w in WEEKDAYS}
+    for k, i, j in pairs:
+        weekday, period = SECTIONS[k]
+        schedule[weekday][period] = {
+            OneOnOneRole.TEACHER: names[teachers[j].line_user_id],
+            OneOnOneRole.STUDENT: names[students[i].line_user_id],
+        }
+    return users, forms, ScheduleModel.model_validate(schedule)
+
+def tool_outputs(users, forms, schedule) -> dict[str, tuple[object, str]]:
+    """工具名稱 → (JSON 模式的回傳值, 精簡模式的回傳值)"""
+    return {
+        "get_one_on_one_tutoring_schedule": (schedule, format_schedule(schedule)),
+        "get_all_one_on_one_tutoring_registrations": (forms, format_forms(forms)),
+        "get_one_on_one_tutoring_registration": (forms[0], format_form(forms[0])),
+        "get_user_info": (users[0], format_user(users[0])),
+    }
+
+def serialize(value) -> str:
+    if isinstance(value, str):
+        return value
+    return pydantic_core.to_json(value, fallback=str).decode()
+
+def ask_claude(client, model: str, text: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    response = client.messages.create(
+        model=model,
+        max_tokens=100,
+        messages=[{"role": "user", "content": f"{QUESTION}\n\n{text}"}]
+    )
+    return time.perf_counter() - start, response.usage.input_tokens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count-tokens", action="store_true", help="以 API 計算 token 數 (預設為粗估)")
+    parser.add_argument("--claude", type=int, default=0, metavar="N", help="每種格式實際呼叫 Claude N 次")
+    parser.add_argument("--model", default="claude-sonnet-4-20250514")
+    parser.add_argument("--show", action="store_true", help="印出精簡格式的內容")
+    args = parser.parse_args()
+
+    client = None
+    if args.count_tokens or args.claude:
+        import anthropic
+        client = anthropic.Anthropic()
+
+    def count(text: str) -> int:
+        if args.count_tokens:
+            return client.messages.count_tokens(
+                model=args.model, messages=[{"role": "user", "content": text}]
+            ).input_tokens
+        return estimate_tokens(text)
+
+    outputs = tool_outputs(*make_data(args.students, args.teachers, args.seed))
+    print(f"{'tool':<44} {'json bytes':>10} {'compact':>8} {'json tok':>9} {'compact':>8} {'saved':>6}")
+    for tool, (json_value, compact_value) in outputs.items():
+        json_text, compact_text = serialize(json_value), serialize(compact_value)
+        json_tokens, compact_tokens = count(json_text), count(compact_text)
+        saved = 1 - compact_tokens / json_tokens
+        print(
+            f"{tool:<44} {len(json_text.encode()):>10} {len(compact_text.encode()):>8} "
+            f"{json_tokens:>9} {compact_tokens:>8} {saved:>6.0%}"
+        )
+        if args.show:
+            print(compact_text, end="\n\n")
+
+    if args.claude:
+        json_value, compact_value = outputs["get_one_on_one_tutoring_schedule"]
+        for name, text in (("json", serialize(json_value)), ("compact", serialize(compact_value))):
+            runs = [ask_claude(client, args.model, text) for _ in range(args.claude)]
+            latencies = [latency for latency, _ in runs]
+            print(
+                f"claude {name:<8} input_tokens={runs[0][1]:<6} "
+                f"median={statistics.median(latencies):.3f}s min={min(latencies):.3f}s max={max(latencies):.3f}s"
+            )
+
+if __name__ == "__main__":
+    main()
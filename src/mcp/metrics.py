@@ -0,0 +1,25 @@
+"""MCP server 的 Prometheus 指標，由 server.py 的 TimingMiddleware 記錄，/metrics 輸出"""
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_SECONDS = Histogram("mcp_request_seconds", "MCP 請求的耗時", ["method"], buckets=BUCKETS)
+TOOL_SECONDS = Histogram("mcp_tool_seconds", "工具執行的耗時", ["tool", "status"], buckets=BUCKETS)
+SLOW_TOOL_CALLS = Counter("mcp_slow_tool_calls", "超過 MCP_SLOW_TOOL_SECONDS 的工具呼叫", ["tool"])
+
+class UserCacheCollector(Collector):
+    """在 /metrics 被讀取時輸出 UserCache.stats() 的命中與未命中次數"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats()
+        lookups = CounterMetricFamily("mcp_user_cache_lookups", "使用者快取的查詢結果", labels=["result"])
+        lookups.add_metric(["request_hit"], stats["request_hits"])
+        lookups.add_metric(["hit"], stats["hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        yield lookups
+        yield GaugeMetricFamily("mcp_user_cache_size", "使用者快取目前的項目數", value=stats["size"])
@@ -2,6 +2,7 @@ from ortools.graph.python.max_flow import SimpleMaxFlow
 from typing import TypeVar, Generic, TypedDict
 from pydantic import BaseModel
 import random
+import time
 
 StudentType = TypeVar("StudentType")
 Section = TypeVar("Section")
@@ -25,9 +26,12 @@ class SectionStudentTeacher(BaseModel, Generic[Section, StudentType, TeacherType
 def schedule(
     students: list[Student[StudentType, Section]],
     teachers: list[Teacher[TeacherType, Section]],
+    timings: dict[str, float] | None = None,
 ) -> list[SectionStudentTeacher[Section, StudentType, TeacherType]]:
+    """timings: 若有傳入，會記錄建圖 (build)、求解 (solve)、整理結果 (extract) 的秒數"""
     if not students or not teachers:
         return []
+    start = time.perf_counter()
     # all possible time slots
     sections = list(set[Section].union(
         *[s.available_time for s in students],
@@ -75,7 +79,9 @@ def schedule(
         max_flow.add_arc_with_capacity(teacher_id, teacher_p_id, teacher.max_students)
         max_flow.add_arc_with_capacity(teacher_p_id, teacher_sink, teacher.max_students)
     
+    built = time.perf_counter()
     max_flow.solve(student_source, teacher_sink)
+    solved = time.perf_counter()
     
     student_section_edges_solution = [edge for edge in student_section_edges if max_flow.flow(edge) > 0]
     section_teacher_edges_solution = [edge for edge in section_teacher_edges if max_flow.flow(edge) > 0]
@@ -99,6 +105,10 @@ def schedule(
             for edge in section_teacher_edges_solution
         ]
     ]
+    if timings is not None:
+        timings["build"] = built - start
+        timings["solve"] = solved - built
+        timings["extract"] = time.perf_counter() - solved
     return section_student_teacher
 
 if __name__ == "__main__":
@@ -0,0 +1,316 @@
+"""以 bitmask 表示可上課時間的一對一排課引擎
+
+和 `one_on_one.schedule` 解同一個最大流問題
+(source → 學生 → 時段 (容量 1) → 老師 (容量 max_students) → sink)，
+但可上課時間以整數 bitmask 表示，流量網路也不實際建出來:
+
+- 每個時段最多一堂課，總流量不超過時段數 (台科大一週 7×14 = 98 節)，
+  因此增廣路徑只需要在「時段」這一層搜尋，已配對的學生 / 老師都不超過時段數。
+- 尚未配對的學生、還有名額的老師各自收斂成「每個時段有幾個人有空」的計數，
+  以 NumPy 一次算出，之後每次增廣只做 O(時段數) 的更新。
+- 先以貪婪法配對，再用 BFS 找增廣路徑補到最大流，結果的配對數與 ortools 版本相同。
+
+`schedule_masks` 是不依賴 pydantic 的核心；`schedule` 則和 `one_on_one.schedule` 介面相同。
+"""
+import time
+from collections import defaultdict, deque
+from typing import Iterable, Sequence, TypeVar
+import numpy as np
+from one_on_one import Student, Teacher, SectionStudentTeacher
+
+StudentType = TypeVar("StudentType")
+Section = TypeVar("Section")
+TeacherType = TypeVar("TeacherType")
+
+def bit_matrix(masks: Sequence[int], n_sections: int) -> np.ndarray:
+    """把 bitmask 列表展開成 (len(masks), n_sections) 的 bool 矩陣"""
+    n_bytes = max(1, (n_sections + 7) // 8)
+    buffer = b"".join(mask.to_bytes(n_bytes, "little") for mask in masks)
+    packed = np.frombuffer(buffer, dtype=np.uint8).reshape(len(masks), n_bytes)
+    return np.unpackbits(packed, axis=1, count=n_sections, bitorder="little").astype(bool)
+
+def iter_bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class BitsetMatcher:
+    """最大流的狀態，可以從既有的配對開始繼續增廣"""
+
+    def __init__(
+        self,
+        student_masks: Sequence[int],
+        teacher_masks: Sequence[int],
+        teacher_capacity: Sequence[int] | int = 1,
+        n_sections: int | None = None,
+    ):
+        if n_sections is None:
+            n_sections = max((m.bit_length() for m in (*student_masks, *teacher_masks)), default=0)
+        if isinstance(teacher_capacity, int):
+            teacher_capacity = [teacher_capacity] * len(teacher_masks)
+        self.n_sections = n_sections
+        self.student_masks = list(student_masks)
+        self.teacher_masks = list(teacher_masks)
+        self.capacity = np.asarray(teacher_capacity, dtype=np.int64)
+
+        self.S = bit_matrix(self.student_masks, n_sections)
+        self.T = bit_matrix(self.teacher_masks, n_sections)
+        self.student_degree = self.S.sum(axis=1)
+        self.teacher_degree = self.T.sum(axis=1)
+
+        self.free = np.ones(len(self.student_masks), dtype=bool)
+        self.load = np.zeros(len(self.teacher_masks), dtype=np.int64)
+        self.spare = self.capacity > 0
+        # 每個時段: 有空且尚未配對的學生數 / 有空且還有名額的老師數
+        self.free_count = self.S.sum(axis=0).astype(np.int64)
+        self.spare_count = self.T[self.spare].sum(axis=0).astype(np.int64)
+
+        self.student_in = [-1] * n_sections # 時段 → 學生
+        self.teacher_out = [-1] * n_sections # 時段 → 老師
+        self.student_section: dict[int, int] = {}
+        self.teacher_sections: dict[int, set[int]] = defaultdict(set)
+        self.augmentations = 0
+
+    # ---- 狀態更新 ----
+
+    def _match_student(self, student: int):
+        self.free[student] = False
+        self.free_count -= self.S[student]
+
+    def _add_student_edge(self, student: int, section: int):
+        self.student_in[section] = student
+        self.student_section[student] = section
+
+    def _remove_student_edge(self, student: int, section: int):
+        if self.student_in[section] == student:
+            self.student_in[section] = -1
+        if self.student_section.get(student) == section:
+            del self.student_section[student]
+
+    def _add_teacher_edge(self, section: int, teacher: int):
+        self.teacher_out[section] = teacher
+        self.teacher_sections[teacher].add(section)
+        self.load[teacher] += 1
+
+    def _remove_teacher_edge(self, section: int, teacher: int):
+        if self.teacher_out[section] == teacher:
+            self.teacher_out[section] = -1
+        self.teacher_sections[teacher].discard(section)
+        if not self.teacher_sections[teacher]:
+            del self.teacher_sections[teacher]
+        self.load[teacher] -= 1
+
+    def _refresh_spare(self, teachers: Iterable[int]):
+        for teacher in set(teachers):
+            spare = bool(self.load[teacher] < self.capacity[teacher])
+            if spare != self.spare[teacher]:
+                self.spare[teacher] = spare
+                if spare:
+                    self.spare_count += self.T[teacher]
+                else:
+                    self.spare_count -= self.T[teacher]
+
+    def _pick_free_student(self, section: int) -> int:
+        candidates = np.flatnonzero(self.S[:, section] & self.free)
+        # 優先排可上課時間最少的學生，保留彈性給其他人
+        return int(candidates[np.argmin(self.student_degree[candidates])])
+
+    def _pick_spare_teacher(self, section: int, exclude: int) -> int:
+        mask = self.T[:, section] & self.spare
+        if exclude >= 0:
+            mask[exclude] = False
+        candidates = np.flatnonzero(mask)
+        return int(candidates[np.argmin(self.teacher_degree[candidates])])
+
+    def _spare_elsewhere(self, section: int) -> bool:
+        """除了目前在這個時段上課的老師以外，是否還有有名額的老師"""
+        count = self.spare_count[section]
+        current = self.teacher_out[section]
+        if current >= 0 and self.spare[current]:
+            count -= 1
+        return count > 0
+
+    # ---- 配對 ----
+
+    def assign(self, section: int, student: int, teacher: int) -> bool:
+        """直接加入一組配對 (用於保留上一次的結果)，不合法時回傳 False"""
+        if (
+            self.student_in[section] != -1
+            or not self.free[student]
+            or not self.spare[teacher]
+            or not (self.student_masks[student] >> section) & 1
+            or not (self.teacher_masks[teacher] >> section) & 1
+        ):
+            return False
+        self._match_student(student)
+        self._add_student_edge(student, section)
+        self._add_teacher_edge(section, teacher)
+        self._refresh_spare([teacher])
+        return True
+
+    def greedy(self):
+        """直接配對: 時段沒人用、且有空閒的學生與老師，稀缺的時段先排"""
+        order = np.argsort(np.minimum(self.free_count, self.spare_count), kind="stable")
+        for section in order.tolist():
+            if self.student_in[section] != -1:
+                continue
+            if self.free_count[section] > 0 and self.spare_count[section] > 0:
+                student = self._pick_free_student(section)
+                teacher = self._pick_spare_teacher(section, -1)
+                self.assign(section, student, teacher)
+
+    def augment(self) -> bool:
+        """找一條增廣路徑並套用，找不到 (已是最大流) 時回傳 False"""
+        K = self.n_sections
+        # 節點編號: 時段入口 k、時段出口 K+k、已配對學生 ("u", i)、已滿的老師 ("v", j)
+        parent: dict = {}
+        queue = deque()
+        for section in np.flatnonzero(self.free_count > 0).tolist():
+            parent[section] = None
+            queue.append(section)
+
+        busy = list(self.teacher_sections)
+        end = None
+        while queue and end is None:
+            node = queue.popleft()
+            if isinstance(node, tuple):
+                kind, index = node
+                if kind == "u":
+                    current = self.student_section[index]
+                    for section in iter_bits(self.student_masks[index]):
+                        if section != current and section not in parent:
+                            parent[section] = node
+                            queue.append(section)
+                else:
+                    for section in self.teacher_sections[index]:
+                        out = K + section
+                        if out not in parent:
+                            parent[out] = node
+                            queue.append(out)
+            elif node < K:
+                section = node
+                student = self.student_in[section]
+                if student == -1:
+                    if K + section not in parent:
+                        parent[K + section] = node
+                        queue.append(K + section)
+                elif ("u", student) not in parent:
+                    parent[("u", student)] = node
+                    queue.append(("u", student))
+            else:
+                section = node - K
+                if self._spare_elsewhere(section):
+                    end = node
+                    break
+                current = self.teacher_out[section]
+                if current >= 0 and section not in parent:
+                    parent[section] = node
+                    queue.append(section)
+                for teacher in busy:
+                    if teacher != current and (self.teacher_masks[teacher] >> section) & 1 and ("v", teacher) not in parent:
+                        parent[("v", teacher)] = node
+                        queue.append(("v", teacher))
+
+        if end is None:
+            return False
+
+        path = [end]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        path.reverse()
+
+        first_section = path[0]
+        last_section = path[-1] - K
+        first_student = self._pick_free_student(first_section)
+        last_teacher = self._pick_spare_teacher(last_section, self.teacher_out[last_section])
+
+        touched = [last_teacher]
+        self._match_student(first_student)
+        self._add_student_edge(first_student, first_section)
+        for a, b in zip(path, path[1:]):
+            if isinstance(a, tuple):
+                kind, index = a
+                if kind == "u":
+                    self._add_student_edge(index, b) # 學生改到另一個時段
+                else:
+                    self._remove_teacher_edge(b - K, index) # 老師讓出原本的時段
+                    touched.append(index)
+            elif a < K:
+                if isinstance(b, tuple):
+                    self._remove_student_edge(b[1], a) # 原本的學生讓出時段
+                # else: 時段入口 → 出口，時段開始使用
+            else:
+                if isinstance(b, tuple):
+                    self._add_teacher_edge(a - K, b[1]) # 時段改由另一位老師上課
+                    touched.append(b[1])
+                # else: 時段出口 → 入口，時段不再使用
+        self._add_teacher_edge(last_section, last_teacher)
+        self._refresh_spare(touched)
+        self.augmentations += 1
+        return True
+
+    def solve(self) -> list[tuple[int, int, int]]:
+        self.greedy()
+        while self.augment():
+            pass
+        return self.result()
+
+    def result(self) -> list[tuple[int, int, int]]:
+        """(時段, 學生 index, 老師 index)"""
+        return [
+            (section, student, self.teacher_out[section])
+            for section, student in enumerate(self.student_in)
+            if student != -1
+        ]
+
+def schedule_masks(
+    student_masks: Sequence[int],
+    teacher_masks: Sequence[int],
+    teacher_capacity: Sequence[int] | int = 1,
+    n_sections: int | None = None,
+    timings: dict[str, float] | None = None,
+) -> list[tuple[int, int, int]]:
+    """回傳 (時段 bit, 學生 index, 老師 index) 的列表
+
+    timings: 若有傳入，會記錄建立矩陣 (build)、配對 (solve) 的秒數與增廣次數 (augmentations)
+    """
+    if not student_masks or not teacher_masks:
+        return []
+    start = time.perf_counter()
+    matcher = BitsetMatcher(student_masks, teacher_masks, teacher_capacity, n_sections)
+    built = time.perf_counter()
+    result = matcher.solve()
+    if timings is not None:
+        timings["build"] = built - start
+        timings["solve"] = time.perf_counter() - built
+        timings["augmentations"] = matcher.augmentations
+    return result
+
+def schedule(
+    students: list[Student[StudentType, Section]],
+    teachers: list[Teacher[TeacherType, Section]],
+) -> list[SectionStudentTeacher[Section, StudentType, TeacherType]]:
+    """與 `one_on_one.schedule` 相同的介面"""
+    if not students or not teachers:
+        return []
+    sections = list(set[Section].union(
+        *[s.available_time for s in students],
+        *[t.available_time for t in teachers]
+    ))
+    section2bit = {v: i for i, v in enumerate(sections)}
+    def to_mask(available_time) -> int:
+        mask = 0
+        for section in available_time:
+            mask |= 1 << section2bit[section]
+        return mask
+    result = schedule_masks(
+        [to_mask(s.available_time) for s in students],
+        [to_mask(t.available_time) for t in teachers],
+        [t.max_students for t in teachers],
+        len(sections),
+    )
+    return [
+        SectionStudentTeacher(section=sections[k], student=students[i].obj, teacher=teachers[j].obj)
+        for k, i, j in result
+    ]
@@ -0,0 +1,178 @@
+"""在背景執行的排課工作
+
+求解是純 CPU 運算，放在 process pool 執行，不會佔住 MCP server 的 event loop，也不受 GIL 影響。
+工具送出工作後立即回傳 job id，之後以 `ScheduleJobManager.get` 查詢進度與結果。
+
+- 同一種排課 (key 相同) 若已有工作還在排隊、尚未開始讀取報名資料，直接沿用那份工作，
+  多位幹部同時要求更新時只會多排一次。
+- 取消排隊或求解中的工作會丟棄結果，不會寫入資料庫；已經在寫入課表的工作無法取消。
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Hashable, Literal, Sequence
+
+logger = logging.getLogger("piano-club.schedule_jobs")
+
+JobStatus = Literal["queued", "running", "done", "failed", "cancelled"]
+
+def solve_masks(
+    engine: str,
+    student_masks: Sequence[int],
+    teacher_masks: Sequence[int],
+    n_sections: int,
+    previous: Sequence[tuple[int, int, int]] = ()
+) -> tuple[list[tuple[int, int, int]], int]:
+    """在 worker process 中執行，回傳 ((時段 bit, 學生 index, 老師 index) 的列表, 沿用的配對數)
+
+    previous 只有 bitset 引擎會使用: 先沿用上一次仍然合法的配對，再以增廣路徑補到最大配對。
+    """
+    import one_on_one_bitset
+    if not student_masks or not teacher_masks:
+        return [], 0
+    if engine == "ortools":
+        import one_on_one
+        result = one_on_one.schedule(
+            students=[
+                one_on_one.Student(available_time=set(one_on_one_bitset.iter_bits(mask)), obj=i)
+                for i, mask in enumerate(student_masks)
+            ],
+            teachers=[
+                one_on_one.Teacher(available_time=set(one_on_one_bitset.iter_bits(mask)), max_students=1, obj=j)
+                for j, mask in enumerate(teacher_masks)
+            ]
+        )
+        return [(t.section, t.student, t.teacher) for t in result], 0
+    matcher = one_on_one_bitset.BitsetMatcher(student_masks, teacher_masks, teacher_capacity=1, n_sections=n_sections)
+    kept = sum(1 for section, i, j in previous if matcher.assign(section, i, j))
+    return matcher.solve(), kept
+
+class ScheduleJob:
+    def __init__(self, key: Hashable):
+        self.id = uuid.uuid4().hex[:8]
+        self.key = key
+        self.status: JobStatus = "queued"
+        self.stage = "排隊中"
+        self.progress: dict[str, Any] = {}
+        self.created_at = datetime.now()
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.result: Any = None
+        self.error: str | None = None
+        self.cancellable = True
+        self.task: asyncio.Task | None = None
+        self._stage_started = time.monotonic()
+
+    def update(self, stage: str, cancellable: bool = True, **progress):
+        """進入下一個階段，並記錄上一個階段花費的秒數"""
+        now = time.monotonic()
+        if self.status == "queued":
+            self.status = "running"
+            self.started_at = datetime.now()
+        else:
+            self.progress.setdefault("seconds", {})[self.stage] = round(now - self._stage_started, 3)
+        self._stage_started = now
+        self.stage = stage
+        self.cancellable = cancellable
+        self.progress.update(progress)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def snapshot(self) -> dict:
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at.isoformat(timespec="seconds"),
+            **self.progress,
+        }
+        if self.started_at and self.active:
+            info["elapsed_seconds"] = round((datetime.now() - self.started_at).total_seconds(), 1)
+        if self.finished_at and self.started_at:
+            info["elapsed_seconds"] = round((self.finished_at - self.started_at).total_seconds(), 1)
+        if self.error:
+            info["error"] = self.error
+        if self.status == "done":
+            info["result"] = self.result
+        return info
+
+class ScheduleJobManager:
+    def __init__(self, max_workers: int = 1, keep: int = 20):
+        self.max_workers = max_workers
+        self.keep = keep
+        self.jobs: OrderedDict[str, ScheduleJob] = OrderedDict()
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # 第一次排課時才建立；使用 spawn，避免 fork 到 event loop 與 Mongo client 的狀態
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run_in_pool(self, fn: Callable, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        except BrokenProcessPool:
+            # worker 異常結束 (例如記憶體不足被砍) 後整個 pool 都不能再用，下次重新建立
+            self._executor = None
+            raise
+
+    def submit(
+        self,
+        key: Hashable,
+        run: Callable[[ScheduleJob], Awaitable[Any]]
+    ) -> tuple[ScheduleJob, bool]:
+        """回傳 (工作, 是否為新建立的工作)"""
+        for job in self.jobs.values():
+            if job.key == key and job.status == "queued":
+                return job, False
+        job = ScheduleJob(key)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        self._prune()
+        return job, True
+
+    async def _run(self, job: ScheduleJob, run: Callable[[ScheduleJob], Awaitable[Any]]):
+        try:
+            job.result = await run(job)
+            job.update("完成", cancellable=False)
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            job.stage = "已取消"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            logger.exception(f"排課工作 {job.id} 失敗")
+        finally:
+            job.finished_at = datetime.now()
+            job.task = None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or not job.active or not job.cancellable or job.task is None:
+            return False
+        return job.task.cancel()
+
+    def get(self, job_id: str) -> ScheduleJob | None:
+        return self.jobs.get(job_id)
+
+    def latest(self) -> ScheduleJob | None:
+        return next(reversed(self.jobs.values()), None)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self.jobs) - self.keep)]:
+            del self.jobs[job_id]
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+from mongo.schema import UserModel
+
+# 單一 MCP 請求內共用的查詢結果，由 middleware 在請求開始時設定
+_request_users: ContextVar[dict[str, UserModel] | None] = ContextVar("request_users", default=None)
+
+class UserCache:
+    """以 line_user_id 為 key 的使用者快取: 請求內快取 + 跨請求的 TTL/LRU 快取
+
+    只快取存在的使用者；會修改使用者的工具 (join_club、approve_admin_request) 必須呼叫 invalidate。
+    """
+
+    def __init__(self, ttl: float = 30, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, UserModel]] = OrderedDict()
+        self.request_hits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def begin_request(self):
+        return _request_users.set({})
+
+    def end_request(self, token):
+        _request_users.reset(token)
+
+    async def get(self, line_user_id: str, load: Callable[[str], Awaitable[UserModel | None]]) -> UserModel | None:
+        scoped = _request_users.get()
+        if scoped is not None and line_user_id in scoped:
+            with self._lock:
+                self.request_hits += 1
+            return scoped[line_user_id]
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(line_user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(line_user_id)
+                self.hits += 1
+                user = entry[1]
+            else:
+                self.misses += 1
+                user = None
+
+        if user is None:
+            user = await load(line_user_id)
+            if user is not None:
+                with self._lock:
+                    self._entries[line_user_id] = (now + self.ttl, user)
+                    self._entries.move_to_end(line_user_id)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+
+        if scoped is not None and user is not None:
+            scoped[line_user_id] = user
+        return user
+
+    def invalidate(self, line_user_id: str):
+        with self._lock:
+            self._entries.pop(line_user_id, None)
+        scoped = _request_users.get()
+        if scoped is not None:
+            scoped.pop(line_user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "request_hits": self.request_hits,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -1,10 +1,19 @@
 from pydantic import BaseModel, Field
 from mongo.schema import line_user_id_field
-from anthropic.types.beta import BetaMessageParam
 from typing import List
 from datetime import datetime
 
+class HistoryStatsModel(BaseModel):
+    history_bytes: int = 0 # 目前 history 的大小
+    tool_result_bytes_saved: int = 0 # 工具結果改存摘要累計節省的大小
+    tool_result_tokens_saved: int = 0
+
 class ConversationHistoryModel(BaseModel):
     line_user_id: str = line_user_id_field
-    history: List[BetaMessageParam] = Field(default_factory=list)
+    # BetaMessageParam 格式的 dict。不以 List[BetaMessageParam] 驗證: pydantic 會把其中 Iterable 型別的欄位
+    # (例如 content) 換成只能走訪一次的 ValidatorIterator，送出請求後再寫回就會變成空的 content
+    history: List[dict] = Field(default_factory=list)
+    summary: str = "" # 已從 history 移除的較舊對話的摘要
+    generation: int = 0 # /clear 時遞增，寫入歷史時比對，讓清除前開始的對話不會把歷史寫回去
+    stats: HistoryStatsModel = Field(default_factory=HistoryStatsModel)
     last_updated: datetime = Field(default_factory=datetime.now)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from mongo.schema import line_user_id_field
+from typing import List, Optional
+from datetime import datetime
+
+class PendingMessageModel(BaseModel):
+    text: str
+    reply_token: str
+    received_at: datetime = Field(default_factory=datetime.now)
+
+class MessageInboxModel(BaseModel):
+    line_user_id: str = line_user_id_field
+    pending: List[PendingMessageModel] = Field(default_factory=list)
+    lease_owner: Optional[str] = None # 正在處理這位用戶訊息的 worker
+    lease_until: Optional[datetime] = None
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from mongo.schema import line_user_id_field
+from datetime import datetime
+
+class TurnLogModel(BaseModel):
+    """每一輪對話的紀錄 (呼叫 Claude 或由快速路徑回答)"""
+    line_user_id: str = line_user_id_field
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0 # 寫入 prompt cache 的 token 數
+    cache_read_input_tokens: int = 0 # 命中 prompt cache 的 token 數
+    tier: Optional[str] = None # fast / large
+    fallback: Optional[str] = None # large 逾時 (timeout) 或過載 (overloaded) 而改用 fast 時的原因
+    latency_ms: float = 0 # Claude: API 呼叫時間; 快速路徑: 查詢與回覆的時間
+    route: Optional[str] = None # 由快速路徑回答時的意圖，None 表示呼叫了 Claude
+    saved_tokens_estimate: int = 0 # 快速路徑: 以該用戶上一輪 Claude 的用量估計省下的 token 數
+    created_at: datetime = Field(default_factory=datetime.now)
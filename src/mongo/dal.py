@@ -0,0 +1,73 @@
+"""linebot 每則訊息都會經過的資料存取
+
+- 用戶以一次 `find_one_and_update` + `$setOnInsert` 取得或建立，不再先查詢、再新增、衝突時再查詢一次。
+- 對話歷史只取回呼叫 Claude 需要的 history 與 summary (不含 stats 等欄位)。
+- 這些文件都是由 linebot / mcp 以 pydantic 模型寫入的，讀取時以 `model_construct` 建立模型，
+  不重新驗證 (history 是 TypedDict 的列表，逐一驗證的成本很高)，直接使用 dict。
+- history 必須維持原本的 dict / list: 以 BetaMessageParam 驗證會把 content 換成只能走訪一次的 iterator，
+  送出請求後寫回的 assistant 訊息會變成空的 (見 mongo/ConversationHistory.py)。
+"""
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from anthropic.types.beta import BetaMessageParam
+from mongo.schema import UserModel, UserRole
+
+USER_PROJECTION = {"_id": 0, "line_user_id": 1, "student_id": 1, "name": 1, "role": 1}
+HISTORY_PROJECTION = {"_id": 0, "history": 1, "summary": 1, "generation": 1}
+
+def trusted_user(doc: dict) -> UserModel:
+    """由自己寫入的文件建立 UserModel，不經過驗證；role 仍轉成 enum，讓以 UserRole 為 key 的查表正常運作"""
+    return UserModel.model_construct(
+        line_user_id=doc["line_user_id"],
+        student_id=doc.get("student_id", ""),
+        name=doc.get("name", ""),
+        role=UserRole(doc.get("role", UserRole.GENERAL)),
+    )
+
+def get_or_create_user(users: Collection, line_user_id: str) -> tuple[UserModel, bool]:
+    """回傳 (用戶, 是否為新建立的)，一次來回完成。line_user_id 來自已驗證簽章的 webhook，不另外驗證格式"""
+    new_user = UserModel.model_construct(line_user_id=line_user_id)
+    try:
+        doc = users.find_one_and_update(
+            {"line_user_id": line_user_id},
+            {"$setOnInsert": new_user.model_dump(mode="json")},
+            projection=USER_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # 同一位用戶的另一則訊息剛好同時建立了資料
+        doc = users.find_one({"line_user_id": line_user_id}, USER_PROJECTION)
+    if doc is None:
+        return new_user, True
+    return trusted_user(doc), False
+
+def load_history(conversation_history: Collection, line_user_id: str) -> tuple[list[BetaMessageParam], str, int]:
+    """回傳 (history, summary, generation)，沒有對話歷史時回傳空的 history。history 為資料庫中的原始 dict，不經過驗證"""
+    doc = conversation_history.find_one({"line_user_id": line_user_id}, HISTORY_PROJECTION)
+    if doc is None:
+        return [], "", 0
+    return doc.get("history", []), doc.get("summary", ""), doc.get("generation", 0)
+
+def history_filter(line_user_id: str, generation: int) -> dict:
+    """只在讀取之後沒有被 /clear 清除時才寫入；generation 為 0 時也符合沒有這個欄位的舊文件"""
+    return {"line_user_id": line_user_id, "generation": {"$in": [0, None]} if generation == 0 else generation}
+
+def clear_history(conversation_history: Collection, line_user_id: str) -> bool:
+    """清除對話歷史與摘要並遞增 generation，回傳原本是否有對話歷史。
+
+    不刪除文件: 進行中的對話讀到的是舊的 generation，之後的寫入不會符合 `history_filter`。
+    """
+    doc = conversation_history.find_one_and_update(
+        {"line_user_id": line_user_id},
+        {
+            "$set": {"history": [], "summary": "", "stats.history_bytes": 0, "last_updated": datetime.now()},
+            "$inc": {"generation": 1}
+        },
+        projection={"_id": 0, "history": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    return bool(doc and doc.get("history"))
@@ -0,0 +1,106 @@
+"""給 Claude 閱讀的精簡文字格式
+
+工具結果會放進 Claude 的 context 並存進對話歷史，JSON 中大量的 null、欄位名稱與引號都會花費 token。
+這裡改用台科大節次表示時段 (例如 "M3" 為週一第 3 節)，課表只列出有課的時段，
+可上課時間則以連續節次的範圍表示 (例如 "M3-5,8 W1-2")。
+"""
+from typing import Iterable
+from mongo.schema import (
+    CLASS_PERIOD, WEEKDAYS, ClassPeriod, OneOnOneFormModel, OneOnOneRole, ScheduleModel, UserModel, Weekday
+)
+
+ROLE_NAMES = {OneOnOneRole.TEACHER: "老師", OneOnOneRole.STUDENT: "學生"}
+
+def format_section(section: tuple[Weekday, ClassPeriod]) -> str:
+    weekday, period = section
+    return f"{weekday}{period}"
+
+def format_periods(periods: Iterable[ClassPeriod]) -> str:
+    """依節次順序合併連續的節次，例如 ["3", "4", "5", "8"] → "3-5,8" """
+    indices = sorted(CLASS_PERIOD.index(p) for p in set(periods))
+    ranges = []
+    start = prev = None
+    for i in indices:
+        if prev is not None and i == prev + 1:
+            prev = i
+            continue
+        if start is not None:
+            ranges.append((start, prev))
+        start = prev = i
+    if start is not None:
+        ranges.append((start, prev))
+    return ",".join(
+        CLASS_PERIOD[a] if a == b else f"{CLASS_PERIOD[a]}-{CLASS_PERIOD[b]}"
+        for a, b in ranges
+    )
+
+def format_available_time(available_time: Iterable[tuple[Weekday, ClassPeriod]]) -> str:
+    by_weekday: dict[Weekday, list[ClassPeriod]] = {}
+    for weekday, period in available_time:
+        by_weekday.setdefault(weekday, []).append(period)
+    parts = [f"{w}{format_periods(by_weekday[w])}" for w in WEEKDAYS if w in by_weekday]
+    return " ".join(parts) or "(無)"
+
+def parse_available_time(text: str) -> set[tuple[Weekday, ClassPeriod]]:
+    """`format_available_time` 的反向，例如 "M3-5,8 W1-2" 或 "M3 M4 WA"，格式錯誤時拋出 ValueError"""
+    sections: set[tuple[Weekday, ClassPeriod]] = set()
+    for token in text.replace("、", " ").replace(";", " ").split():
+        weekday, periods = token[0].upper(), token[1:].upper()
+        if weekday not in WEEKDAYS or not periods:
+            raise ValueError(f"無法解析的時段: {token}")
+        for part in periods.split(","):
+            first, _, last = part.partition("-")
+            if first not in CLASS_PERIOD or (last and last not in CLASS_PERIOD):
+                raise ValueError(f"無法解析的時段: {token}")
+            a = CLASS_PERIOD.index(first)
+            b = CLASS_PERIOD.index(last) if last else a
+            if b < a:
+                raise ValueError(f"節次範圍順序錯誤: {token}")
+            sections |= {(weekday, p) for p in CLASS_PERIOD[a:b + 1]}
+    return sections
+
+def schedule_lessons(schedule: ScheduleModel) -> list[str]:
+    """有課的時段，每堂課為 "時段 老師→學生" """
+    return [
+        f"{weekday}{period} {cell[OneOnOneRole.TEACHER]}→{cell[OneOnOneRole.STUDENT]}"
+        for weekday in WEEKDAYS
+        for period, cell in schedule.root.get(weekday, {}).items()
+        if cell
+    ]
+
+def format_schedule(schedule: ScheduleModel) -> str:
+    """每堂課一行 "時段 老師→學生"，沒有課的時段省略"""
+    lines = schedule_lessons(schedule)
+    if not lines:
+        return "課表中沒有任何課程"
+    return f"共 {len(lines)} 堂課 (時段 老師→學生):\n" + "\n".join(lines)
+
+def format_form(form: OneOnOneFormModel, name: str | None = None) -> str:
+    who = f"{name or '<無名稱>'} ({form.line_user_id})" if name is not None else form.line_user_id
+    return f"{who} {ROLE_NAMES[form.role]} {format_available_time(form.available_time)}"
+
+def format_next_cursor(next_cursor: str | None) -> str:
+    return f"\n還有下一頁，cursor: {next_cursor}" if next_cursor else ""
+
+def format_forms(
+    forms: list[OneOnOneFormModel],
+    names: dict[str, str] | None = None,
+    next_cursor: str | None = None
+) -> str:
+    header = "名字 (LINE user id)" if names is not None else "LINE user id"
+    lines = [format_form(form, None if names is None else names.get(form.line_user_id, "")) for form in forms]
+    return (
+        f"{len(forms)} 份報名 ({header} 身分 可上課時間):\n"
+        + "\n".join(lines)
+        + format_next_cursor(next_cursor)
+    )
+
+def format_admin_requests(requests: list[dict], next_cursor: str | None = None) -> str:
+    """requests: 含 line_user_id、name、student_id 的幹部申請"""
+    return "\n".join(
+        f"{r.get('name') or '<無名稱>'} 學號 {r.get('student_id') or '(無)'} ({r['line_user_id']})"
+        for r in requests
+    ) + format_next_cursor(next_cursor)
+
+def format_user(user: UserModel) -> str:
+    return f"{user.name or '<無名稱>'} 學號 {user.student_id or '(無)'} 身分 {user.role.value} ({user.line_user_id})"
@@ -0,0 +1,73 @@
+"""以 _id 為游標的分頁查詢
+
+游標是上一頁最後一筆文件的 _id 編碼後的字串，對呼叫端而言不透明。
+依 _id 排序並以 `_id > 游標` 接續，不論 collection 多大，每頁都只掃描需要的文件，
+也不會像 skip 一樣因為前面新增或刪除文件而漏掉或重複。
+"""
+import base64
+import binascii
+import re
+from bson import ObjectId
+from bson.errors import InvalidId
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(last_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(last_id.binary).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> ObjectId:
+    """游標格式錯誤時拋出 ValueError"""
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, InvalidId, TypeError) as e:
+        raise ValueError(f"無效的游標: {cursor}") from e
+
+def page_pipeline(
+    match: dict,
+    cursor: str | None,
+    page_size: int,
+    project: dict,
+    name_prefix: str | None = None,
+    require_user: bool = False
+) -> list[dict]:
+    """依 line_user_id 併入 users 的 name / student_id 後分頁的 aggregation pipeline
+
+    多取一筆 (page_size + 1) 用來判斷是否還有下一頁，交給 `split_page` 處理。
+    """
+    if cursor:
+        match = {**match, "_id": {"$gt": decode_cursor(cursor)}}
+    pipeline: list[dict] = [
+        {"$match": match},
+        {"$sort": {"_id": 1}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "line_user_id",
+            "foreignField": "line_user_id",
+            "as": "user",
+        }},
+    ]
+    if name_prefix:
+        pipeline.append({"$match": {"user.name": {"$regex": f"^{re.escape(name_prefix)}"}}})
+    elif require_user:
+        pipeline.append({"$match": {"user.0": {"$exists": True}}})
+    pipeline += [
+        {"$limit": page_size + 1},
+        {"$project": {
+            "line_user_id": 1,
+            "name": {"$first": "$user.name"},
+            "student_id": {"$first": "$user.student_id"},
+            **project,
+        }},
+    ]
+    return pipeline
+
+def clamp_page_size(page_size: int) -> int:
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+def split_page(docs: list[dict], page_size: int) -> tuple[list[dict], str | None]:
+    """回傳 (這一頁的文件, 下一頁的游標)，沒有下一頁時游標為 None"""
+    if len(docs) <= page_size:
+        return docs, None
+    docs = docs[:page_size]
+    return docs, encode_cursor(docs[-1]["_id"])
@@ -0,0 +1,89 @@
+"""一對一課表的 process 內快取
+
+課表文件除了各天的節次外，還有每次更新都會遞增的 `version`。
+快取保存最後一次讀到的版本與驗證過的 `ScheduleModel`:
+
+- 距離上次確認不到 max_age 秒時直接回傳快取，不查詢資料庫。
+- 否則先只取回 `version` 確認版本，版本變了才取回整份課表並重新驗證。
+  課表文件被刪除 (例如重設) 時清空快取，不會繼續回傳舊的課表。
+
+linebot 使用 `get` (pymongo)，mcp 使用 `get_async` (AsyncMongoClient)。
+"""
+import threading
+import time
+from datetime import datetime
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.collection import Collection
+from mongo.schema import ScheduleModel
+
+def schedule_update(schedule: ScheduleModel) -> dict:
+    """寫入新課表並遞增版本的 update 文件，搭配 upsert 使用"""
+    return {
+        "$set": {**schedule.model_dump(mode="json"), "updated_at": datetime.now()},
+        "$inc": {"version": 1},
+    }
+
+VERSION_PROJECTION = {"_id": 0, "version": 1}
+
+class ScheduleCache:
+    def __init__(self, max_age: float = 5):
+        self.max_age = max_age
+        self.version: int | None = None
+        self.schedule: ScheduleModel | None = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.probes = 0
+        self.fetches = 0
+
+    def _cached(self) -> bool:
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.max_age:
+                self.hits += 1
+                return True
+            self.probes += 1
+            return False
+
+    def _changed(self, probe: dict | None) -> bool:
+        """probe: 只含 version 的課表文件。回傳是否需要取回整份課表 (文件不存在時取回 None 並清空快取)"""
+        if probe is None or probe.get("version") != self.version:
+            return True
+        with self._lock:
+            self._checked_at = time.monotonic()
+        return False
+
+    def _apply(self, doc: dict | None):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if doc is None:
+                self.version = None
+                self.schedule = None
+                return
+            self.fetches += 1
+            self.version = doc.pop("version", None)
+            doc.pop("updated_at", None)
+            self.schedule = ScheduleModel.model_validate(doc)
+
+    def get(self, collection: Collection) -> ScheduleModel | None:
+        if not self._cached():
+            if self.schedule is None or self._changed(collection.find_one({}, VERSION_PROJECTION)):
+                self._apply(collection.find_one({}, {"_id": 0}))
+        return self.schedule
+
+    async def get_async(self, collection: AsyncCollection) -> ScheduleModel | None:
+        if not self._cached():
+            if self.schedule is None or self._changed(await collection.find_one({}, VERSION_PROJECTION)):
+                self._apply(await collection.find_one({}, {"_id": 0}))
+        return self.schedule
+
+    def put(self, version: int, schedule: ScheduleModel):
+        """同一個 process 寫入課表後直接更新快取"""
+        with self._lock:
+            if self.version is None or version >= self.version:
+                self.version = version
+                self.schedule = schedule
+                self._checked_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"version": self.version, "hits": self.hits, "probes": self.probes, "fetches": self.fetches}
@@ -9,6 +9,12 @@ CLASS_PERIOD = ("1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "A", "B", "C"
 
 line_user_id_field = Field(..., pattern=r"^U[a-f0-9]{32}$")
 
+def normalize_student_id(student_id) -> str:
+    """學號一律存成去除空白的大寫，批次匯入以學號查詢使用者時才比對得到"""
+    return str(student_id or "").strip().upper()
+
+StudentId = Annotated[str, BeforeValidator(normalize_student_id)]
+
 class OneOnOneRole(str, Enum):
     TEACHER = "teacher"
     STUDENT = "student"
@@ -22,6 +28,12 @@ Schedule = dict[Weekday, dict[ClassPeriod, dict[OneOnOneRole, str] | None]]
 class ScheduleModel(RootModel[Schedule]):
     pass
 
+class OneOnOneAssignmentModel(BaseModel):
+    """課表中的一組配對，保留下來供下次增量排課沿用"""
+    section: tuple[Weekday, ClassPeriod]
+    student: str = line_user_id_field
+    teacher: str = line_user_id_field
+
 class UserRole(str, Enum):
     GENERAL = "general" # 一般人、非社員
     MEMBER = "member" # 社員
@@ -29,6 +41,6 @@ class UserRole(str, Enum):
 
 class UserModel(BaseModel):
     line_user_id: str = line_user_id_field
-    student_id: Optional[str] = ""
+    student_id: Optional[StudentId] = ""
     name: Optional[str] = ""
     role: UserRole = Field(default=UserRole.GENERAL)
\ No newline at end of file
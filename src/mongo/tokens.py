@@ -0,0 +1,6 @@
+"""不呼叫 API 的 token 數估計，linebot 的對話歷史預算與 mcp 的工具輸出 benchmark 共用"""
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數: 中日韓文字約一字一 token，其他字元約四字一 token"""
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk) // 4 + 1
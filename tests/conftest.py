@@ -0,0 +1,86 @@
+"""測試共用設定
+
+和容器內的目錄結構一樣載入模組: src/mongo 為 `mongo`，src/linebot 為 `app` (Dockerfile 把它複製到 /app/app)，
+src/mcp 的模組 (server.py、user_cache.py …) 則直接以檔名載入。
+MongoDB 以 mongomock 代替，Claude client 以 FakeClaude 代替，不需要任何外部服務。
+"""
+import sys
+import types
+from functools import partial
+from pathlib import Path
+import mongomock
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+sys.path.append(str(SRC / "mcp"))
+if "app" not in sys.modules:
+    package = types.ModuleType("app")
+    package.__path__ = [str(SRC / "linebot")]
+    sys.modules["app"] = package
+
+from anthropic.types import Message
+from anthropic.types.beta import BetaMessage
+
+class FakeClaude:
+    """代替 anthropic.Anthropic: 依序回傳預先準備的回應，並記錄每個請求的參數
+
+    回應為 content block 的列表或要拋出的例外。
+    """
+
+    def __init__(self, *responses: list[dict] | Exception):
+        self.responses = list(responses)
+        self.requests: list[dict] = []
+        self.messages = types.SimpleNamespace(create=partial(self.create, Message))
+        self.beta = types.SimpleNamespace(messages=types.SimpleNamespace(
+            create=partial(self.create, BetaMessage)
+        ))
+
+    def with_options(self, **options) -> "FakeClaude":
+        return self
+
+    def next_response(self, request: dict) -> list[dict]:
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def message(self, model_class, request: dict, content: list[dict]):
+        return model_class.model_validate({
+            "id": f"msg_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": request["model"],
+            "content": content,
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 5},
+        })
+
+    def create(self, model_class, **request):
+        return self.message(model_class, request, self.next_response(request))
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()["piano-club"]
+
+@pytest.fixture
+def linebot(monkeypatch, db):
+    """linebot 的 app 模組，資料庫換成 mongomock，Claude 不串流"""
+    from app import app as linebot_app
+    monkeypatch.setattr(linebot_app, "conversation_history", db.conversation_history)
+    monkeypatch.setattr(linebot_app, "turn_log", db.turn_log)
+    monkeypatch.setattr(linebot_app.inbox, "collection", db.message_inbox)
+    monkeypatch.setattr(linebot_app, "CLAUDE_STREAMING", False)
+    monkeypatch.setattr(linebot_app, "MODEL_TIERING", False)
+    return linebot_app
+
+@pytest.fixture
+def fake_claude(monkeypatch, linebot):
+    """`fake_claude(*responses)` 把 linebot 的 Claude client 換成回傳 responses 的假 client"""
+    def install(*responses: list[dict] | Exception) -> FakeClaude:
+        fake = FakeClaude(*responses)
+        monkeypatch.setattr(linebot, "claude_client", fake)
+        return fake
+    return install
@@ -0,0 +1,101 @@
+import pytest
+from app import history as history_window
+from mongo.ConversationHistory import ConversationHistoryModel
+
+USER_ID = "U" + "1" * 32
+SCHEDULE = '{"M": {"1": "", "2": "小明"}, "T": {"1": ""}}'
+
+def test_assistant_content_survives_two_turns(db, linebot, fake_claude):
+    claude = fake_claude(
+        [
+            {"type": "mcp_tool_use", "id": "mcptoolu_1", "name": "get_schedule", "server_name": "piano-club", "input": {}},
+            {"type": "mcp_tool_result", "tool_use_id": "mcptoolu_1", "is_error": False,
+             "content": [{"type": "text", "text": SCHEDULE}]},
+            {"type": "text", "text": "星期一第二節有課"},
+        ],
+        [{"type": "text", "text": "不客氣"}],
+    )
+    user = linebot.UserModel(line_user_id=USER_ID)
+
+    assert "星期一第二節有課" in linebot.call_claude("課表?", user)
+    assert linebot.call_claude("謝謝", user) == "不客氣"
+
+    history = db.conversation_history.find_one({"line_user_id": USER_ID})["history"]
+    assert [m["role"] for m in history] == ["user", "assistant", "user", "assistant"]
+    first = history[1]["content"]
+    assert [block["type"] for block in first] == ["mcp_tool_use", "mcp_tool_result", "text"]
+    assert first[2]["text"] == "星期一第二節有課"
+    # 第二輪時第一輪的工具結果已換成摘要
+    assert first[1]["content"][0]["text"].startswith(history_window.TOOL_RESULT_PREFIX)
+    # 第二輪的請求帶著第一輪完整的 assistant 訊息
+    assert len(claude.requests[1]["messages"][1]["content"]) == 3
+
+def test_compact_tool_results_skips_malformed_content():
+    content = iter([])
+    history = [
+        {"role": "user", "content": "課表?"},
+        {"role": "assistant", "content": content},
+        {"role": "user", "content": "謝謝"},
+    ]
+    compacted, saved_bytes, _ = history_window.compact_tool_results(history, keep_turns=1)
+    assert compacted[1]["content"] is content
+    assert saved_bytes == 0
+
+def test_malformed_history_does_not_lose_reply(db, linebot, fake_claude):
+    db.conversation_history.insert_one({"line_user_id": USER_ID, "history": [
+        {"role": "user", "content": "課表?"},
+        {"role": "assistant", "content": {"type": "text", "text": "格式錯誤的舊資料"}},
+        {"role": "user", "content": "好"},
+        {"role": "assistant", "content": [{"type": "text", "text": "還有其他問題嗎?"}]},
+    ]})
+    fake_claude([{"type": "text", "text": "不客氣"}])
+    assert linebot.call_claude("謝謝", linebot.UserModel(line_user_id=USER_ID)) == "不客氣"
+    history = db.conversation_history.find_one({"line_user_id": USER_ID})["history"]
+    assert history[1]["content"] == {"type": "text", "text": "格式錯誤的舊資料"}
+    assert len(history) == 6
+
+def test_validated_history_survives_compaction():
+    history = [
+        {"role": "user", "content": "課表?"},
+        {"role": "assistant", "content": [
+            {"type": "mcp_tool_result", "tool_use_id": "mcptoolu_1", "is_error": False,
+             "content": [{"type": "text", "text": SCHEDULE * 10}]},
+        ]},
+        {"role": "user", "content": "謝謝"},
+    ]
+    validated = ConversationHistoryModel.model_validate({"line_user_id": USER_ID, "history": history}).history
+    compacted, saved_bytes, _ = history_window.compact_tool_results(validated, keep_turns=1)
+    assert saved_bytes > 0
+    assert len(compacted[1]["content"]) == 1
+
+def test_clear_during_turn_is_not_undone(db, linebot, fake_claude, monkeypatch):
+    from mongo import dal
+    from mongo.indexes import ensure_indexes
+    ensure_indexes(db)
+    fake_claude([{"type": "text", "text": "第一輪"}], [{"type": "text", "text": "第二輪"}])
+    user = linebot.UserModel(line_user_id=USER_ID)
+    linebot.call_claude("你好", user)
+
+    # 模擬在第二輪的 Claude 呼叫期間收到 /clear
+    load_history = dal.load_history
+    def load_then_clear(collection, line_user_id):
+        loaded = load_history(collection, line_user_id)
+        dal.clear_history(collection, line_user_id)
+        return loaded
+    monkeypatch.setattr(dal, "load_history", load_then_clear)
+    assert linebot.call_claude("還在嗎", user) == "第二輪"
+
+    doc = db.conversation_history.find_one({"line_user_id": USER_ID})
+    assert doc["history"] == [] and doc["generation"] == 1
+    assert db.conversation_history.count_documents({}) == 1
+
+def test_create_claude_client(linebot):
+    client = linebot.create_claude_client()
+    assert client.max_retries == linebot.ANTHROPIC_MAX_RETRIES
+    assert client.timeout.read == linebot.ANTHROPIC_TIMEOUT
+    assert client.timeout.connect == linebot.ANTHROPIC_CONNECT_TIMEOUT
+    pool = client._client._transport._pool
+    assert pool._max_connections == linebot.ANTHROPIC_MAX_CONNECTIONS
+    assert pool._max_keepalive_connections == linebot.ANTHROPIC_MAX_KEEPALIVE
+    # call_claude 以延遲預算覆寫逾時
+    assert client.with_options(max_retries=0, timeout=linebot.MODEL_LATENCY_BUDGET).timeout == linebot.MODEL_LATENCY_BUDGET
@@ -0,0 +1,46 @@
+import os
+from types import SimpleNamespace
+from prometheus_client import REGISTRY
+from app.clients import PoolMonitor
+
+SAMPLES = {
+    "capacity": ("linebot_mongo_pool_capacity", {}),
+    "open": ("linebot_mongo_pool_open", {}),
+    "checked_out": ("linebot_mongo_pool_checked_out", {}),
+    "checkouts": ("linebot_mongo_pool_checkouts_total", {"result": "ok"}),
+    "failures": ("linebot_mongo_pool_checkouts_total", {"result": "failed"}),
+    "waits": ("linebot_mongo_pool_wait_seconds_count", {}),
+}
+
+def snapshot() -> dict[str, float]:
+    return {key: REGISTRY.get_sample_value(name, labels) or 0.0 for key, (name, labels) in SAMPLES.items()}
+
+def test_pool_monitor_exports_metrics():
+    before = snapshot()
+    event = SimpleNamespace()
+    monitor = PoolMonitor(8)
+    monitor.pool_created(event)
+    monitor.connection_created(event)
+    monitor.connection_created(event)
+    monitor.connection_check_out_started(event)
+    monitor.connection_checked_out(event)
+    monitor.connection_check_out_started(event)
+    monitor.connection_check_out_failed(event)
+
+    after = snapshot()
+    assert {key: after[key] - before[key] for key in SAMPLES} == {
+        "capacity": 8, "open": 2, "checked_out": 1, "checkouts": 1, "failures": 1, "waits": 1,
+    }
+    assert monitor.stats()["checked_out"] == 1
+
+    monitor.connection_checked_in(event)
+    monitor.connection_closed(event)
+    monitor.connection_closed(event)
+    monitor.pool_closed(event)
+    after = snapshot()
+    assert [after[key] - before[key] for key in ("capacity", "open", "checked_out")] == [0, 0, 0]
+
+def test_health_reports_worker_pid(linebot):
+    body = linebot.app.test_client().get("/health").get_json()
+    assert body["worker"]["pid"] == os.getpid()
+    assert set(body["worker"]["pools"]) == {"mongo", "line", "anthropic"}
@@ -0,0 +1,45 @@
+import json
+from mongo import dal
+from mongo.schema import UserRole
+
+USER_ID = "U" + "6" * 32
+ASSISTANT = {"role": "assistant", "content": [
+    {"type": "mcp_tool_use", "id": "mcptoolu_1", "name": "get_user_info", "server_name": "piano-club", "input": {}},
+    {"type": "mcp_tool_result", "tool_use_id": "mcptoolu_1", "is_error": False,
+     "content": [{"type": "text", "text": "王小明 B11000001"}]},
+    {"type": "text", "text": "你是王小明"},
+]}
+
+def test_load_history_returns_reusable_lists(db):
+    history = [{"role": "user", "content": "我是誰?"}, ASSISTANT]
+    db.conversation_history.insert_one({"line_user_id": USER_ID, "history": history, "summary": "摘要"})
+
+    loaded, summary, generation = dal.load_history(db.conversation_history, USER_ID)
+    assert summary == "摘要"
+    assert generation == 0
+    # 走訪兩次 (送出請求、寫回歷史) 內容都還在
+    assert json.dumps(loaded) == json.dumps(loaded)
+    assert loaded == history
+    assert isinstance(loaded[1]["content"], list)
+    assert isinstance(loaded[1]["content"][1]["content"], list)
+
+def test_load_history_without_document(db):
+    assert dal.load_history(db.conversation_history, USER_ID) == ([], "", 0)
+
+def test_get_or_create_user(db):
+    user, created = dal.get_or_create_user(db.users, USER_ID)
+    assert created and user.line_user_id == USER_ID
+    db.users.update_one({"line_user_id": USER_ID}, {"$set": {"role": UserRole.MEMBER.value, "name": "王小明"}})
+    user, created = dal.get_or_create_user(db.users, USER_ID)
+    assert not created
+    assert user.role is UserRole.MEMBER and user.name == "王小明"
+    assert db.users.count_documents({}) == 1
+
+def test_clear_history_bumps_generation(db):
+    db.conversation_history.insert_one({"line_user_id": USER_ID, "history": [{"role": "user", "content": "hi"}]})
+    assert dal.clear_history(db.conversation_history, USER_ID)
+    assert dal.load_history(db.conversation_history, USER_ID) == ([], "", 1)
+    assert not dal.clear_history(db.conversation_history, USER_ID)
+    # 清除前讀取的 generation 不再符合
+    assert db.conversation_history.count_documents(dal.history_filter(USER_ID, 0)) == 0
+    assert db.conversation_history.count_documents(dal.history_filter(USER_ID, 2)) == 1
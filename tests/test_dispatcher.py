@@ -0,0 +1,30 @@
+import threading
+from prometheus_client import REGISTRY
+from app.dispatcher import EventDispatcher
+
+def sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+def test_queue_metrics():
+    release = threading.Event()
+    started = threading.Event()
+    def handle(item):
+        started.set()
+        release.wait(5)
+    dispatcher = EventDispatcher(handle, workers=1, max_queue=2)
+    rejected = sample("linebot_webhook_rejected_total")
+    dispatcher.start()
+    try:
+        assert sample("linebot_webhook_queue_capacity") == 2
+        assert dispatcher.submit(["a"])
+        assert started.wait(5)
+        assert sample("linebot_webhook_workers_busy") == 1
+        assert dispatcher.submit(["b", "c"])
+        assert sample("linebot_webhook_queue_depth") == 2
+        assert not dispatcher.submit(["d"])
+        assert sample("linebot_webhook_rejected_total") == rejected + 1
+    finally:
+        release.set()
+        dispatcher.shutdown(timeout=5)
+    assert sample("linebot_webhook_queue_depth") == 0
+    assert sample("linebot_webhook_workers_busy") == 0
@@ -0,0 +1,135 @@
+"""大模型逾時 / overloaded 時的 fallback
+
+Claude client 使用真正的 anthropic SDK，只把 HTTP transport 換成 mock，
+因此例外都是 SDK 實際會拋出的型別 (包括串流途中未被 SDK 包裝的傳輸錯誤)。
+"""
+import importlib
+import json
+import anthropic
+import pytest
+
+# SDK 內部使用的 HTTP 套件 (依版本為 httpx 或 httpx2)
+http = importlib.import_module(anthropic.DefaultHttpxClient.__mro__[1].__module__.split(".")[0])
+
+USER_ID = "U" + "5" * 32
+TOOL_USE = {"type": "mcp_tool_use", "id": "mcptoolu_1", "name": "join_club", "server_name": "piano-club", "input": {}}
+OVERLOADED = {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}
+
+def sse(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+def message_start(model: str) -> dict:
+    return {"type": "message_start", "message": {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": model, "content": [],
+        "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 10, "output_tokens": 1},
+    }}
+
+class EventStream(http.SyncByteStream):
+    """依序送出 SSE 事件，遇到例外就在串流途中拋出"""
+
+    def __init__(self, events: list):
+        self.events = events
+
+    def __iter__(self):
+        for event in self.events:
+            if isinstance(event, Exception):
+                raise event
+            yield sse(event)
+
+def text_reply(model: str, text: str) -> list:
+    return [
+        message_start(model),
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 5}},
+        {"type": "message_stop"},
+    ]
+
+def tool_started(model: str, error: Exception | dict) -> list:
+    return [message_start(model), {"type": "content_block_start", "index": 0, "content_block": TOOL_USE}, error]
+
+def json_reply(model: str, text: str) -> http.Response:
+    return http.Response(200, json={
+        "id": "msg_1", "type": "message", "role": "assistant", "model": model,
+        "content": [{"type": "text", "text": text}], "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    })
+
+class SdkClaude:
+    """以 mock transport 建立的 anthropic.Anthropic；每個回應為 SSE 事件列表、Response 或連線時拋出的例外"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests: list[dict] = []
+        self.client = anthropic.Anthropic(
+            api_key="test", max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(transport=http.MockTransport(self.handle)),
+        )
+
+    def handle(self, request) -> http.Response:
+        self.requests.append(json.loads(request.content))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        if isinstance(response, http.Response):
+            return response
+        return http.Response(200, headers={"content-type": "text/event-stream"}, stream=EventStream(response))
+
+@pytest.fixture
+def sdk_claude(monkeypatch, linebot):
+    def install(*responses) -> SdkClaude:
+        claude = SdkClaude(*responses)
+        monkeypatch.setattr(linebot, "claude_client", claude.client)
+        return claude
+    return install
+
+@pytest.fixture
+def streaming(monkeypatch, linebot):
+    monkeypatch.setattr(linebot, "CLAUDE_STREAMING", True)
+    return linebot
+
+def history(db) -> list[dict]:
+    doc = db.conversation_history.find_one({"line_user_id": USER_ID})
+    return doc["history"] if doc else []
+
+def models(claude: SdkClaude) -> list[str]:
+    return [r["model"] for r in claude.requests]
+
+def test_connect_timeout_falls_back(db, streaming, sdk_claude):
+    claude = sdk_claude(http.ConnectTimeout("timed out"), text_reply(streaming.ANTHROPIC_FAST_MODEL, "你好"))
+    assert streaming.call_claude("你好", streaming.UserModel(line_user_id=USER_ID)) == "你好"
+    assert models(claude) == [streaming.ANTHROPIC_MODEL, streaming.ANTHROPIC_FAST_MODEL]
+
+def test_timeout_mid_stream_before_tool_use_falls_back(db, streaming, sdk_claude):
+    claude = sdk_claude(
+        [message_start(streaming.ANTHROPIC_MODEL), http.ReadTimeout("timed out")],
+        text_reply(streaming.ANTHROPIC_FAST_MODEL, "你好"),
+    )
+    assert streaming.call_claude("你好", streaming.UserModel(line_user_id=USER_ID)) == "你好"
+    assert models(claude) == [streaming.ANTHROPIC_MODEL, streaming.ANTHROPIC_FAST_MODEL]
+
+@pytest.mark.parametrize("error", [
+    http.ReadTimeout("timed out"),
+    http.RemoteProtocolError("peer closed connection without sending complete message body"),
+])
+def test_interrupted_after_tool_use_is_not_resent(db, streaming, sdk_claude, error):
+    claude = sdk_claude(tool_started(streaming.ANTHROPIC_MODEL, error), text_reply(streaming.ANTHROPIC_FAST_MODEL, "入社成功"))
+    reply = streaming.call_claude("我要入社", streaming.UserModel(line_user_id=USER_ID))
+    assert "可能已經完成" in reply
+    assert len(claude.requests) == 1
+    assert history(db) == []
+
+def test_overloaded_after_tool_use_is_not_resent(db, streaming, sdk_claude):
+    claude = sdk_claude(tool_started(streaming.ANTHROPIC_MODEL, OVERLOADED), text_reply(streaming.ANTHROPIC_FAST_MODEL, "入社成功"))
+    assert "可能已經完成" in streaming.call_claude("我要入社", streaming.UserModel(line_user_id=USER_ID))
+    assert len(claude.requests) == 1
+
+def test_non_streaming_falls_back_only_on_529(db, linebot, sdk_claude):
+    claude = sdk_claude(http.Response(529, json=OVERLOADED), json_reply(linebot.ANTHROPIC_FAST_MODEL, "你好"))
+    assert linebot.call_claude("你好", linebot.UserModel(line_user_id=USER_ID)) == "你好"
+    assert len(claude.requests) == 2
+
+    claude = sdk_claude(http.ReadTimeout("timed out"))
+    assert "可能已經完成" in linebot.call_claude("我要入社", linebot.UserModel(line_user_id=USER_ID))
+    assert len(claude.requests) == 1
@@ -0,0 +1,60 @@
+import json
+from app import history as history_window
+from mongo.ConversationHistory import ConversationHistoryModel
+
+SCHEDULE = json.dumps({day: {str(p): "" for p in range(1, 15)} for day in "MTWRFSU"})
+
+def tool_turn(question: str, answer: str) -> list[dict]:
+    return [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": [
+            {"type": "mcp_tool_use", "id": "mcptoolu_1", "name": "get_schedule", "server_name": "piano-club", "input": {}},
+            {"type": "mcp_tool_result", "tool_use_id": "mcptoolu_1", "is_error": False,
+             "content": [{"type": "text", "text": SCHEDULE}]},
+            {"type": "text", "text": answer},
+        ]},
+    ]
+
+def stored_history(db, turns: int) -> list[dict]:
+    """經過模型寫入、再從 Mongo 讀回的歷史"""
+    history = [m for i in range(turns) for m in tool_turn(f"第 {i} 週的課表?", f"第 {i} 週沒有課")]
+    doc = ConversationHistoryModel(line_user_id="U" + "0" * 32, history=history).model_dump()
+    db.conversation_history.insert_one(doc)
+    return db.conversation_history.find_one({"line_user_id": doc["line_user_id"]})["history"]
+
+def test_validated_history_keeps_content():
+    history = tool_turn("課表?", "沒有課")
+    model = ConversationHistoryModel.model_validate({"line_user_id": "U" + "0" * 32, "history": history})
+    json.dumps(model.history)
+    assert model.history[1]["content"] == history[1]["content"]
+
+def test_split_history_with_tool_blocks(db):
+    history = stored_history(db, 6)
+    budget = history_window.history_tokens(history) - 1
+    old, kept = history_window.split_history(history, budget, budget // 2)
+    assert old and kept
+    assert old + kept == history
+    assert kept[0]["role"] == "user"
+
+def test_compact_history_summarizes_stored_history(db, linebot, fake_claude, monkeypatch):
+    history = stored_history(db, 6)
+    total = history_window.history_tokens(history)
+    monkeypatch.setattr(linebot, "HISTORY_TOKEN_BUDGET", total - 1)
+    monkeypatch.setattr(linebot, "HISTORY_TOKEN_TARGET", total // 2)
+    claude = fake_claude([{"type": "text", "text": "使用者查詢過課表"}])
+    user = linebot.UserModel(line_user_id="U" + "0" * 32)
+
+    linebot.compact_history(user)
+
+    doc = db.conversation_history.find_one({"line_user_id": user.line_user_id})
+    assert doc["summary"] == "使用者查詢過課表"
+    assert 0 < len(doc["history"]) < len(history)
+    assert doc["history"] == history[-len(doc["history"]):]
+    assert "get_schedule" in claude.requests[0]["messages"][0]["content"]
+
+def test_cap_messages_drops_whole_turns(db):
+    history = stored_history(db, 6)
+    capped = history_window.cap_messages(history, 5)
+    assert capped == history[-4:]
+    assert history_window.cap_messages(history, 0) == history
+    assert history_window.cap_messages(history, 1) == history[-2:]
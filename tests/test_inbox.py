@@ -0,0 +1,29 @@
+import time
+from app.inbox import MessageInbox
+
+USER_ID = "U" + "7" * 32
+
+def test_lease_is_kept_while_processing(db):
+    inbox = MessageInbox(db.message_inbox, lease_seconds=0.3)
+    other = MessageInbox(db.message_inbox, lease_seconds=0.3)
+    inbox.push(USER_ID, "你好", "token")
+    owner = inbox.acquire(USER_ID)
+    with inbox.keep(USER_ID, owner) as lease:
+        time.sleep(0.6)
+        assert other.acquire(USER_ID) is None
+        assert lease.check()
+    time.sleep(0.4)
+    assert other.acquire(USER_ID) is not None
+    assert not lease.check()
+
+def test_lost_lease_skips_history_write(db, linebot, fake_claude):
+    fake_claude([{"type": "text", "text": "你好"}])
+    linebot.inbox.push(USER_ID, "你好", "token")
+    owner = linebot.inbox.acquire(USER_ID)
+    lease = linebot.inbox.keep(USER_ID, owner)
+    # 租約過期後被其他 worker 取得
+    db.message_inbox.update_one({"line_user_id": USER_ID}, {"$set": {"lease_owner": "other"}})
+
+    assert linebot.call_claude("你好", linebot.UserModel(line_user_id=USER_ID), lease) == "你好"
+    assert lease.lost
+    assert db.conversation_history.find_one({"line_user_id": USER_ID}) is None
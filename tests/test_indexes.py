@@ -0,0 +1,21 @@
+import logging
+import pytest
+from mongo import indexes
+
+def test_unique_index_conflict_keeps_data(db, caplog):
+    line_user_id = "U" + "3" * 32
+    db.users.insert_many([{"line_user_id": line_user_id, "name": "a"}, {"line_user_id": line_user_id, "name": "b"}])
+
+    with caplog.at_level(logging.ERROR, logger="mongo.indexes"), pytest.raises(RuntimeError, match="--remove-duplicates"):
+        indexes.ensure_index(db, "users", indexes.line_user_id_unique())
+
+    assert db.users.count_documents({}) == 2
+    assert line_user_id in caplog.text
+
+def test_remove_duplicates_keeps_newest(db):
+    line_user_id = "U" + "3" * 32
+    db.users.insert_many([{"line_user_id": line_user_id, "name": "a"}, {"line_user_id": line_user_id, "name": "b"}])
+
+    assert indexes.remove_duplicates(db, "users", "line_user_id") == 1
+    indexes.ensure_index(db, "users", indexes.line_user_id_unique())
+    assert [doc["name"] for doc in db.users.find()] == ["b"]
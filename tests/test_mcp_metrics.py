@@ -0,0 +1,25 @@
+import asyncio
+from prometheus_client import CollectorRegistry, generate_latest
+from mongo.schema import UserModel
+import metrics
+from user_cache import UserCache
+
+def test_user_cache_counters_exported():
+    cache = UserCache(ttl=30)
+    registry = CollectorRegistry()
+    registry.register(metrics.UserCacheCollector(cache))
+    line_user_id = "U" + "2" * 32
+
+    async def load(line_user_id: str) -> UserModel:
+        return UserModel(line_user_id=line_user_id)
+
+    async def lookups():
+        await cache.get(line_user_id, load)
+        await cache.get(line_user_id, load)
+        await cache.get(line_user_id, load)
+    asyncio.run(lookups())
+
+    assert registry.get_sample_value("mcp_user_cache_lookups_total", {"result": "miss"}) == 1
+    assert registry.get_sample_value("mcp_user_cache_lookups_total", {"result": "hit"}) == 2
+    assert registry.get_sample_value("mcp_user_cache_size") == 1
+    assert b"mcp_user_cache_lookups_total" in generate_latest(registry)
@@ -0,0 +1,77 @@
+"""bitset 排課引擎必須和 ortools 最大流得到相同數量的配對"""
+import random
+from collections import Counter
+import one_on_one
+import one_on_one_bitset
+from schedule_jobs import solve_masks
+
+N_SECTIONS = 98
+
+def random_mask(rng: random.Random, n_sections: int, density: float) -> int:
+    return sum(1 << k for k in range(n_sections) if rng.random() < density)
+
+def assert_valid(result, student_masks, teacher_masks, capacity):
+    sections = [section for section, _, _ in result]
+    students = [student for _, student, _ in result]
+    assert len(set(sections)) == len(sections), "每個時段最多一堂課"
+    assert len(set(students)) == len(students), "每位學生最多一堂課"
+    for teacher, load in Counter(teacher for _, _, teacher in result).items():
+        assert load <= capacity[teacher]
+    for section, student, teacher in result:
+        assert student_masks[student] >> section & 1
+        assert teacher_masks[teacher] >> section & 1
+
+def ortools_size(student_masks, teacher_masks, capacity) -> int:
+    return len(one_on_one.schedule(
+        [one_on_one.Student(obj=i, available_time=set(one_on_one_bitset.iter_bits(m))) for i, m in enumerate(student_masks)],
+        [
+            one_on_one.Teacher(obj=j, available_time=set(one_on_one_bitset.iter_bits(m)), max_students=c)
+            for j, (m, c) in enumerate(zip(teacher_masks, capacity))
+        ],
+    ))
+
+def test_bitset_matches_ortools():
+    rng = random.Random(20240901)
+    for _ in range(300):
+        n_sections = rng.choice([4, 12, N_SECTIONS])
+        density = rng.choice([0.05, 0.2, 0.5])
+        student_masks = [random_mask(rng, n_sections, density) for _ in range(rng.randint(1, 25))]
+        teacher_masks = [random_mask(rng, n_sections, density) for _ in range(rng.randint(1, 15))]
+        capacity = [rng.randint(1, 3) for _ in teacher_masks]
+
+        result = one_on_one_bitset.schedule_masks(student_masks, teacher_masks, capacity, n_sections)
+        assert_valid(result, student_masks, teacher_masks, capacity)
+        assert len(result) == ortools_size(student_masks, teacher_masks, capacity)
+
+def test_bitset_schedule_interface_matches_ortools():
+    rng = random.Random(7)
+    sections = [f"{day}{period}" for day in "MTWRF" for period in "123456789"]
+    students = [one_on_one.Student(obj=f"s{i}", available_time=set(rng.sample(sections, 4))) for i in range(20)]
+    teachers = [
+        one_on_one.Teacher(obj=f"t{j}", available_time=set(rng.sample(sections, 8)), max_students=2) for j in range(8)
+    ]
+    expected = one_on_one.schedule(students, teachers)
+    result = one_on_one_bitset.schedule(students, teachers)
+    assert len(result) == len(expected)
+    available = {p.obj: p.available_time for p in [*students, *teachers]}
+    assert all(r.section in available[r.student] and r.section in available[r.teacher] for r in result)
+
+def test_incremental_solve_keeps_previous_and_stays_maximum():
+    rng = random.Random(42)
+    for _ in range(100):
+        student_masks = [random_mask(rng, N_SECTIONS, 0.05) for _ in range(30)]
+        teacher_masks = [random_mask(rng, N_SECTIONS, 0.08) for _ in range(15)]
+        previous, _ = solve_masks("bitset", student_masks, teacher_masks, N_SECTIONS)
+        # 改動一位學生的時間，並新增一位學生
+        changed = rng.randrange(len(student_masks))
+        student_masks[changed] = random_mask(rng, N_SECTIONS, 0.05)
+        student_masks.append(random_mask(rng, N_SECTIONS, 0.05))
+
+        result, kept = solve_masks("bitset", student_masks, teacher_masks, N_SECTIONS, previous)
+        still_valid = [
+            (k, i, j) for k, i, j in previous if student_masks[i] >> k & 1 and teacher_masks[j] >> k & 1
+        ]
+        assert kept == len(still_valid)
+        assert_valid(result, student_masks, teacher_masks, [1] * len(teacher_masks))
+        expected, _ = solve_masks("ortools", student_masks, teacher_masks, N_SECTIONS)
+        assert len(result) == len(expected)
@@ -0,0 +1,45 @@
+from mongo import registrations
+
+STUDENT_ID = "B11000001"
+USERS = [{"student_id": STUDENT_ID, "line_user_id": "U" + "4" * 32}]
+
+def test_parse_rows_rejects_non_objects():
+    content = '{"student_id": "B11000001", "role": "student", "periods": "M3-5"}\n[1, 2]\n"B11000002"\n'
+    rows, errors = registrations.parse_rows(content, "jsonl")
+    assert [number for number, _ in rows] == [1]
+    assert [error["row"] for error in errors] == [2, 3]
+
+def test_missing_periods_is_reported():
+    rows, errors = registrations.parse_rows(
+        f'{{"student_id": "{STUDENT_ID}", "role": "student"}}\n{{"student_id": "{STUDENT_ID}", "role": "student", "periods": 3}}\n',
+        "jsonl"
+    )
+    assert errors == []
+    assert registrations.student_ids(rows) == [STUDENT_ID]
+    forms, errors = registrations.build_forms(rows, USERS)
+    assert forms == []
+    assert [(e["row"], e["error"]) for e in errors] == [(1, "缺少可上課時間 (periods)"), (2, "無法辨識的可上課時間: 3")]
+
+def test_short_csv_row_is_reported():
+    rows, errors = registrations.parse_rows(f"student_id,role,periods\n{STUDENT_ID},teacher\n", "csv")
+    forms, row_errors = registrations.build_forms(rows, USERS)
+    assert forms == []
+    assert [(e["row"], e["error"]) for e in errors + row_errors] == [(2, "缺少可上課時間 (periods)")]
+
+def test_valid_rows_import():
+    rows, errors = registrations.parse_rows(f"student_id,role,periods\n{STUDENT_ID},學生,M3-5\n", "csv")
+    forms, row_errors = registrations.build_forms(rows, USERS)
+    assert errors == row_errors == []
+    assert len(forms[0][1].available_time) == 3
+
+def test_student_ids_are_normalized_when_written(db):
+    from mongo.schema import UserModel
+    user = UserModel(line_user_id="U" + "8" * 32, student_id=" b11000001 ")
+    assert user.student_id == STUDENT_ID
+    db.users.insert_one(user.model_dump(mode="json"))
+    db.users.insert_one({"line_user_id": "U" + "9" * 32, "student_id": "b11000002"})
+    db.users.insert_one({"line_user_id": "U" + "a" * 32, "student_id": ""})
+
+    assert registrations.normalize_stored_student_ids(db.users) == 1
+    assert sorted(doc["student_id"] for doc in db.users.find()) == ["", STUDENT_ID, "B11000002"]
+    assert registrations.normalize_stored_student_ids(db.users) == 0
@@ -0,0 +1,16 @@
+from app.reply import EMPTY_REPLY, TRUNCATED, split_reply
+
+def test_blank_reply_has_placeholder():
+    assert split_reply("") == [EMPTY_REPLY]
+    assert split_reply(" \n\n ") == [EMPTY_REPLY]
+
+def test_long_reply_splits_between_lines():
+    lines = [f"- 第 {i} 項" + "字" * 40 for i in range(10)]
+    chunks = split_reply("\n".join(lines), max_chars=100, max_messages=10)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "\n".join(chunks) == "\n".join(lines)
+
+def test_reply_over_message_limit_is_truncated():
+    chunks = split_reply("字" * 250, max_chars=50, max_messages=3)
+    assert len(chunks) == 3
+    assert chunks[-1].endswith(TRUNCATED) and len(chunks[-1]) <= 50
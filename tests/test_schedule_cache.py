@@ -0,0 +1,21 @@
+from mongo.schema import ScheduleModel
+from mongo.schedule_cache import ScheduleCache, schedule_update
+
+def schedule(teacher: str) -> ScheduleModel:
+    return ScheduleModel({"M": {"1": {"teacher": teacher, "student": "學生"}}})
+
+def test_cache_follows_version_and_deletion(db):
+    cache = ScheduleCache(max_age=0)
+    assert cache.get(db.one_on_one_schedule) is None
+
+    db.one_on_one_schedule.update_one({}, schedule_update(schedule("老師甲")), upsert=True)
+    assert cache.get(db.one_on_one_schedule) == schedule("老師甲")
+    assert cache.get(db.one_on_one_schedule) == schedule("老師甲")
+    assert cache.stats()["fetches"] == 1
+
+    db.one_on_one_schedule.update_one({}, schedule_update(schedule("老師乙")), upsert=True)
+    assert cache.get(db.one_on_one_schedule) == schedule("老師乙")
+
+    db.one_on_one_schedule.delete_many({})
+    assert cache.get(db.one_on_one_schedule) is None
+    assert cache.stats()["version"] is None